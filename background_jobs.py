@@ -0,0 +1,80 @@
+"""Encode and decode jobs that run off the Tk mainloop.
+
+A Job runs its function on a worker thread, so the window keeps redrawing and handling input
+while large media is processed. The worker never touches a widget: it watches its own
+instrumentation stages and leaves the latest progress on the job, and the Tk side picks it up
+with after() polling and calls the job's callbacks on the mainloop. Cancelling a job makes the
+next stage lap (each frame, sample block or row strip) raise JobCancelled inside the worker.
+"""
+import itertools
+import threading
+
+import instrumentation
+
+POLL_MS = 16  # Check on running jobs about 60 times a second
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker thread once the job is cancelled."""
+
+
+class Job:
+    """One function call on a worker thread, with progress, cancellation and Tk callbacks.
+
+    on_progress(job, stage, count, total) is called while the job runs, with total None when the
+    stage's size isn't known up front. on_done(job, result) or on_error(job, exception) is
+    called once it ends; a cancelled job ends with JobCancelled.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, target, args=(), on_progress=None, on_done=None, on_error=None):
+        self.id = next(Job._ids)
+        self.target = target
+        self.args = args
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.progress = None  # Latest (stage, count, total) seen by the worker
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"stego-job-{self.id}", daemon=True)
+        self.root = None
+
+    def start(self, root):
+        """Start the worker and poll it from root's mainloop."""
+        self.root = root
+        self.thread.start()
+        root.after(POLL_MS, self.poll)
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def running(self):
+        return self.thread.is_alive()
+
+    def run(self):
+        try:
+            with instrumentation.watch(self.watch):
+                self.result = self.target(*self.args)
+        except Exception as e:
+            self.error = e
+
+    def watch(self, record):
+        """Stage watcher, called on the worker (or its pool threads) at every lap."""
+        if self.cancelled.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+        self.progress = (record["stage"], record["count"], record.get("total"))
+
+    def poll(self):
+        """Hand progress, then the outcome, to the callbacks on the Tk mainloop."""
+        if self.thread.is_alive():
+            if self.on_progress and self.progress is not None:
+                self.on_progress(self, *self.progress)
+            self.root.after(POLL_MS, self.poll)
+        elif self.error is not None:
+            if self.on_error:
+                self.on_error(self, self.error)
+        elif self.on_done:
+            self.on_done(self, self.result)
@@ -0,0 +1,212 @@
+"""Reproducible benchmark suite over the bundled sample media.
+
+Every cover fixture is encoded and decoded with every payload fixture and LSB count, through the
+LSB plugins and through BPCS for image covers. Each case records the best encode and decode time
+over --repeat runs, throughput in MB of cover per second, peak traced memory (measured in a
+separate, untimed run) and whether the payload survived the round trip. Results and the
+environment they were measured in are written to a JSON file, and --compare flags cases that got
+slower than an earlier results file.
+
+Examples:
+    python benchmark.py
+    python benchmark.py --modality image --lsb 1 --lsb 4 --output image.json
+    python benchmark.py --compare benchmark_results.json --output new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import capacity_planner
+import plugins
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+COVERS = ["duck.jpg", "wolf.bmp", "480-360-sample.bmp", "pngTest.png",
+          "mixkit-fast-rocket-whoosh-1714.wav", "flowerShort.mp4"]
+PAYLOADS = ["payload.txt", "payload2.txt", "payload3.txt"]
+METHODS = ("lsb", "bpcs")
+LSB_VALUES = range(1, 9)
+OUTPUT_PATH = "benchmark_results.json"
+REGRESSION_THRESHOLD = 1.2  # Flag cases more than 20% slower than the baseline
+REGRESSION_MIN_SECONDS = 0.005  # ... and by at least this much, so timer noise on tiny cases is ignored
+
+
+def environment():
+    """Describe the machine and code version the benchmark ran on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def build_cases(covers, payloads, lsb_values, methods, modalities=None):
+    """Return the (method, cover, payload, lsb) cases to run, skipping covers no plugin handles."""
+    cases = []
+    for method in methods:
+        for cover in covers:
+            name = plugins.plugin_name_for_path(cover, method)
+            if name is None or (modalities and ("image" if name == "bpcs" else name) not in modalities):
+                continue
+            for payload in payloads:
+                for num_lsb in ([None] if method == "bpcs" else lsb_values):  # BPCS has no LSB count
+                    cases.append({"method": method, "plugin": name, "cover": cover, "payload": payload, "lsb": num_lsb})
+    return cases
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_case(case, repeat=1):
+    """Run one case in the current (scratch) folder and return its result record."""
+    result = dict(case, status="ok", error=None)
+    plugin = plugins.get_plugin(case["plugin"])
+    with open(case["payload"], 'rb') as file:
+        payload = file.read()
+    cover_bytes = os.path.getsize(case["cover"])
+    result.update(cover_bytes=cover_bytes, payload_bytes=len(payload))
+    try:
+        capacity = capacity_planner.cover_capacity(case["cover"], case["lsb"], case["method"])
+        result["capacity"] = capacity
+        if len(payload) > capacity:
+            result["status"] = "skipped"
+            result["error"] = "payload exceeds cover capacity"
+            return result
+        with contextlib.redirect_stdout(io.StringIO()):
+            encode_times, decode_times = [], []
+            for _ in range(repeat):
+                stego_path, seconds = timed(plugin.encode, case["cover"], payload, case["lsb"])
+                encode_times.append(seconds)
+                decoded, seconds = timed(plugin.decode, stego_path, case["lsb"])
+                decode_times.append(seconds)
+
+            # Peak memory is traced in a separate run so tracing doesn't skew the timings
+            tracemalloc.start()
+            stego_path = plugin.encode(case["cover"], payload, case["lsb"])
+            encode_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            plugin.decode(stego_path, case["lsb"])
+            decode_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    encode_seconds, decode_seconds = min(encode_times), min(decode_times)
+    result.update(
+        encode_seconds=encode_seconds, decode_seconds=decode_seconds,
+        encode_mb_per_second=cover_bytes / 1e6 / encode_seconds if encode_seconds else 0.0,
+        decode_mb_per_second=cover_bytes / 1e6 / decode_seconds if decode_seconds else 0.0,
+        encode_peak_bytes=encode_peak, decode_peak_bytes=decode_peak,
+        round_trip=decoded == payload)
+    if not result["round_trip"]:
+        result["status"] = "error"
+        result["error"] = "decoded payload differs from the original"
+    return result
+
+
+def run_benchmark(cases, repeat=1, report=None):
+    """Run every case on scratch copies of the fixtures and return the result records."""
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="stego-bench-") as scratch:
+        for name in {case["cover"] for case in cases} | {case["payload"] for case in cases}:
+            shutil.copy(os.path.join(REPO_DIR, name), scratch)
+        os.chdir(scratch)  # Stego files, BPCS output and video temp folders all land here
+        try:
+            for case in cases:
+                result = run_case(case, repeat)
+                results.append(result)
+                if report:
+                    report(result)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def case_key(result):
+    return result["method"], result["cover"], result["payload"], result["lsb"]
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Return (case, stage, old seconds, new seconds) for cases slower than the baseline by threshold."""
+    with open(baseline_path) as file:
+        baseline = {case_key(result): result for result in json.load(file)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get(case_key(result))
+        if old is None or result["status"] != "ok" or old["status"] != "ok":
+            continue
+        for stage in ("encode_seconds", "decode_seconds"):
+            if result[stage] > old[stage] * threshold and result[stage] - old[stage] > REGRESSION_MIN_SECONDS:
+                regressions.append((case_key(result), stage, old[stage], result[stage]))
+    return regressions
+
+
+def print_result(result):
+    case = f"{result['method']:4} {result['cover']:36} {result['payload']:13} lsb={result['lsb'] or '-'}"
+    if result["status"] == "ok":
+        print(f"[ok]      {case} encode {result['encode_seconds']:.4f}s ({result['encode_mb_per_second']:.1f} MB/s) "
+              f"decode {result['decode_seconds']:.4f}s ({result['decode_mb_per_second']:.1f} MB/s) "
+              f"peak {max(result['encode_peak_bytes'], result['decode_peak_bytes']) / 1e6:.1f} MB")
+    else:
+        print(f"[{result['status']}] {case}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark encode/decode over the bundled sample media.")
+    parser.add_argument("--cover", action="append", choices=COVERS, help="Cover fixture to run; may be repeated (default all)")
+    parser.add_argument("--payload", action="append", choices=PAYLOADS, help="Payload fixture to run; may be repeated (default all)")
+    parser.add_argument("--lsb", type=int, action="append", choices=LSB_VALUES, help="LSB count to run; may be repeated (default 1-8)")
+    parser.add_argument("--method", action="append", choices=METHODS, help="Method to run; may be repeated (default both)")
+    parser.add_argument("--modality", action="append", choices=["image", "audio", "video"], help="Only run these modalities")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is kept (default 3)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help=f"Results file (default {OUTPUT_PATH})")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    args = parser.parse_args(argv)
+
+    cases = build_cases(args.cover or COVERS, args.payload or PAYLOADS, args.lsb or LSB_VALUES,
+                        args.method or METHODS, args.modality)
+    start = time.perf_counter()
+    results = run_benchmark(cases, max(args.repeat, 1), report=print_result)
+    seconds = time.perf_counter() - start
+
+    summary = {"cases": len(results), "seconds": seconds,
+               "ok": sum(result["status"] == "ok" for result in results),
+               "skipped": sum(result["status"] == "skipped" for result in results),
+               "errors": sum(result["status"] == "error" for result in results)}
+    with open(args.output, "w") as file:
+        json.dump({"environment": environment(), "summary": summary, "results": results}, file, indent=2)
+    print(f"{summary['ok']} ok, {summary['skipped']} skipped, {summary['errors']} errors "
+          f"in {seconds:.1f}s; results written to {args.output}")
+
+    failed = summary["errors"] > 0
+    if args.compare:
+        regressions = compare(results, args.compare)
+        for (method, cover, payload, lsb), stage, old, new in regressions:
+            print(f"[slower]  {method} {cover} {payload} lsb={lsb or '-'} {stage}: {old:.4f}s -> {new:.4f}s")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Capacity planner that reports how many payload bytes a cover holds without decoding it.
+
+Each modality plugin answers from header or metadata reads only: image dimensions from PIL's
+header parse, WAV chunk headers, ffprobe frame count and size for video, and a sampled
+complex-block count for BPCS. Jobs that can't fit are rejected before any encoding starts.
+
+Example:
+    python capacity_planner.py duck.jpg flower.mp4 --payload mytext.txt
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+import plugins
+
+CapacityPlan = namedtuple("CapacityPlan", ["cover", "plugin", "num_lsb", "capacity"])
+
+LSB_VALUES = range(1, 9)
+
+
+def cover_capacity(cover_path, num_lsb, method="lsb"):
+    """Return how many uncompressed payload bytes fit in cover_path with num_lsb LSBs."""
+    return plugins.plugin_for_path(cover_path, method).capacity(cover_path, num_lsb)
+
+
+def plan_cover(cover_path, lsb_values=LSB_VALUES, method="lsb"):
+    """Return a CapacityPlan for each LSB count (BPCS ignores the LSB count and gives one plan)."""
+    plugin = plugins.plugin_for_path(cover_path, method)
+    if method == "bpcs":
+        lsb_values = [None]
+    return [CapacityPlan(cover_path, plugin.name, num_lsb, plugin.capacity(cover_path, num_lsb))
+            for num_lsb in lsb_values]
+
+
+def min_lsb(cover_path, payload_size, method="lsb"):
+    """Return the smallest LSB count whose capacity holds payload_size bytes, or None if none does."""
+    for plan in plan_cover(cover_path, LSB_VALUES, method):
+        if plan.capacity >= payload_size:
+            return plan.num_lsb
+    return None
+
+
+def check_fits(cover_path, payload_size, num_lsb, method="lsb"):
+    """Raise ValueError if a payload of payload_size bytes can't fit in the cover."""
+    capacity = cover_capacity(cover_path, num_lsb, method)
+    if payload_size > capacity:
+        raise ValueError(f"Payload of {payload_size} bytes exceeds the {capacity} byte capacity of "
+                         f"{os.path.basename(cover_path)} with {num_lsb} LSB.")
+    return capacity
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the payload capacity of cover files.")
+    parser.add_argument("covers", nargs="+")
+    parser.add_argument("--lsb", type=int, action="append", choices=LSB_VALUES, help="LSB count to plan for; may be repeated (default 1-8)")
+    parser.add_argument("--method", choices=["lsb", "bpcs"], default="lsb")
+    parser.add_argument("--payload", help="Payload file to check against each cover")
+    args = parser.parse_args(argv)
+
+    payload_size = os.path.getsize(args.payload) if args.payload else None
+    failed = False
+    for cover in args.covers:
+        try:
+            plans = plan_cover(cover, args.lsb or LSB_VALUES, args.method)
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            print(f"{cover}: {e}")
+            failed = True
+            continue
+        for plan in plans:
+            fits = "" if payload_size is None else ("  fits" if payload_size <= plan.capacity else "  too small")
+            label = plan.plugin if plan.num_lsb is None else f"{plan.plugin}, {plan.num_lsb} LSB"
+            print(f"{cover} [{label}]: {plan.capacity} bytes{fits}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""LSB embedding in the palette indices of animated GIFs, keeping every frame and its timing.
+
+cv2 reads at most the first frame of a GIF, so GIF covers are handled here with PIL instead.
+The frames are rebuilt over one global palette sorted by luminance, so changing the low bits of
+an index only moves a pixel to a colour of similar brightness. The index arrays of all frames are
+stacked and the payload is embedded into the stack with array operations, then each frame is
+written back with its original duration and disposal method (and the loop count) under the
+shared palette. Animations with more than 256 colours in all are quantized to 256 first.
+
+The palette is always filled up to 256 entries, and GIFs with transparency use the last one for
+it. Pixels whose index shares its high bits with that index never carry payload, so no pixel
+becomes transparent and no transparent pixel changes. The stego header goes in the first usable
+pixels at one LSB and the payload follows at num_lsb, so a decoder can find both again from the
+indices alone.
+"""
+import contextlib
+
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import payload_codec
+import stego_header
+
+LUMINANCE = np.array([0.299, 0.587, 0.114])  # ITU-R BT.601 weights
+MAX_COLOURS = 256
+
+
+@contextlib.contextmanager
+def palette_frames():
+    """Have PIL keep GIF frames as palette images while they share the first frame's palette."""
+    from PIL import GifImagePlugin
+    strategy = GifImagePlugin.LOADING_STRATEGY
+    GifImagePlugin.LOADING_STRATEGY = GifImagePlugin.LoadingStrategy.RGB_AFTER_DIFFERENT_PALETTE_ONLY
+    try:
+        yield
+    finally:
+        GifImagePlugin.LOADING_STRATEGY = strategy
+
+
+def read_frames(path):
+    """Return the composited RGBA frames of a GIF as one (frames, height, width, 4) array, and their timing."""
+    from PIL import Image, ImageSequence
+    with Image.open(path) as image:
+        frames, durations, disposals = [], [], []
+        for frame in ImageSequence.Iterator(image):
+            frames.append(np.asarray(frame.convert('RGBA')))
+            durations.append(frame.info.get('duration', 0))
+            disposals.append(getattr(frame, 'disposal_method', 0))
+        loop = image.info.get('loop')
+    return np.stack(frames), durations, disposals, loop
+
+
+def build_palette(frames):
+    """Map RGBA frames onto one luminance-sorted palette of distinct colours.
+
+    Returns (indices, palette, transparency): a uint8 index per pixel, the palette as (colours, 3)
+    RGB and the index of the transparent colour, or None if nothing is transparent.
+    """
+    from PIL import Image
+    transparent = frames[..., 3] == 0
+    has_transparency = bool(transparent.any())
+    rgb = frames[..., :3]
+    limit = MAX_COLOURS - has_transparency
+    colours, inverse = np.unique(pack(rgb[~transparent]), return_inverse=True)
+    if len(colours) > limit:
+        # Too many colours between the frames: quantize them all together to one shared palette
+        quantized = Image.fromarray(np.ascontiguousarray(rgb.reshape(-1, rgb.shape[2], 3))).quantize(
+            limit, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        palette = np.array(quantized.getpalette()[:limit * 3], dtype=np.uint8).reshape(-1, 3)
+        quantized_indices = np.asarray(quantized).reshape(transparent.shape)[~transparent]
+        # Drop unused and repeated entries
+        colours, inverse = np.unique(pack(palette[quantized_indices]), return_inverse=True)
+    palette = unpack(colours)
+    order = np.argsort(palette @ LUMINANCE, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    indices = np.zeros(transparent.shape, dtype=np.uint8)
+    indices[~transparent] = rank[inverse.reshape(-1)]
+    # Fill the palette up to 256 entries, so changing the low bits of an index never leaves it.
+    # The extra entries are distinct colours close to the brightest one, as PIL remaps repeated ones.
+    brightest = colours[order[-1]]
+    spare = brightest ^ np.arange(1, 1 << 12, dtype=np.uint32)  # Nudges to its green and blue
+    spare = spare[~np.isin(spare, colours)][:MAX_COLOURS - len(colours)]
+    palette = np.concatenate([palette[order], unpack(spare)])
+    transparency = None
+    if has_transparency:
+        transparency = MAX_COLOURS - 1  # One of the extra entries, so no real colour has to share its index
+        indices[transparent] = transparency
+    return indices, palette, transparency
+
+
+def pack(rgb):
+    """Pack RGB triples into single integers."""
+    return (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+
+
+def unpack(packed):
+    return np.stack([(packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF], axis=-1).astype(np.uint8)
+
+
+def carriers(flat, num_lsb, transparency, start=0):
+    """Return the positions from start on whose index can carry num_lsb bits without touching transparency."""
+    positions = np.arange(start, flat.size)
+    if transparency is None:
+        return positions
+    return positions[(flat[start:] >> num_lsb) != (transparency >> num_lsb)]
+
+
+def header_positions(flat, transparency):
+    return carriers(flat, stego_header.HEADER_LSB, transparency)[:stego_header.HEADER_BITS]
+
+
+def payload_positions(flat, num_lsb, transparency, header):
+    """Return the positions of the header followed by those of the payload elements.
+
+    The payload starts after the last header pixel, so embedding it never changes which pixels
+    the header was read from.
+    """
+    return np.concatenate([header, carriers(flat, num_lsb, transparency, int(header[-1]) + 1)])
+
+
+def capacity(path, num_lsb):
+    """Return how many stored bytes encode_gif can hide in a GIF, counting only the usable pixels."""
+    indices, _, transparency = build_palette(read_frames(path)[0])
+    flat = indices.reshape(-1)
+    header = header_positions(flat, transparency)
+    if len(header) < stego_header.HEADER_BITS:
+        return 0
+    return lsb_engine.payload_capacity(len(payload_positions(flat, num_lsb, transparency, header)), num_lsb)
+
+
+def encode_gif(cover_path, stego_path, payload, num_lsb, codec=payload_codec.CODEC_NONE, key=None):
+    """Hide payload bytes behind a stego header in the palette indices of every frame of a GIF."""
+    from PIL import Image
+    with instrumentation.stage("image", "encode", "cover_read", path=cover_path) as stage:
+        frames, durations, disposals, loop = read_frames(cover_path)
+        stage.add(bytes=frames.nbytes, count=len(frames))
+    with instrumentation.stage("image", "encode", "bit_prep") as stage:
+        indices, palette, transparency = build_palette(frames)
+        stored = payload_codec.pack_payload(payload, codec)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("image", "encode", "embed") as stage:
+        flat = indices.reshape(-1)
+        header = header_positions(flat, transparency)
+        if len(header) < stego_header.HEADER_BITS:
+            raise ValueError("Insufficient bytes, need bigger image, smaller payload or more LSB.")
+        positions = payload_positions(flat, num_lsb, transparency, header)
+        carrier = flat[positions]  # Gathered, so the engine sees one contiguous cover
+        lsb_engine.embed_payload(carrier, stored, num_lsb, stego_header.MODALITY_IMAGE, key)
+        flat[positions] = carrier
+        stage.add(bytes=len(stored), count=len(positions))
+    with instrumentation.stage("image", "encode", "write", path=stego_path) as stage:
+        palette_bytes = palette.tobytes()
+        images = []
+        for frame in indices:
+            image = Image.fromarray(frame, 'P')
+            image.putpalette(palette_bytes)
+            images.append(image)
+        # Passing the palette makes PIL write it once as the global colour table, with no local ones
+        options = {"duration": durations, "disposal": disposals, "optimize": False, "palette": palette_bytes}
+        if loop is not None:
+            options["loop"] = loop
+        if transparency is not None:
+            options["transparency"] = transparency
+        images[0].save(stego_path, save_all=True, append_images=images[1:], **options)
+        stage.add(bytes=indices.nbytes, count=len(images))
+    return stego_path
+
+
+def read_indices(path):
+    """Return the stacked palette indices of a GIF's frames and its transparent index, or None
+    if the frames don't share one palette (so the GIF wasn't written by encode_gif)."""
+    from PIL import Image, ImageSequence
+    with palette_frames(), Image.open(path) as image:
+        frames = []
+        for frame in ImageSequence.Iterator(image):
+            if frame.mode != 'P':
+                return None
+            frames.append(np.asarray(frame))
+        transparency = image.info.get('transparency')
+    return np.stack(frames), transparency
+
+
+def decode_gif(stego_path, key=None):
+    """Return the payload bytes hidden in a GIF by encode_gif, or None if there is none."""
+    with instrumentation.stage("image", "decode", "cover_read", path=stego_path) as stage:
+        found = read_indices(stego_path)
+        if found is None:
+            return None
+        indices, transparency = found
+        stage.add(bytes=indices.nbytes, count=len(indices))
+    flat = indices.reshape(-1)
+    header_elements = header_positions(flat, transparency)
+    header = lsb_engine.read_header(flat[header_elements])
+    if header is None or header.modality != stego_header.MODALITY_IMAGE:
+        return None
+    with instrumentation.stage("image", "decode", "extract") as stage:
+        positions = payload_positions(flat, header.num_lsb, transparency, header_elements)
+        stored = lsb_engine.extract_payload(flat[positions], header, key)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("image", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
@@ -0,0 +1,196 @@
+"""Per-stage timing and metrics for the encode and decode paths.
+
+Each path is split into named stages (cover_read, bit_prep, embed, write, mux, cleanup, ...).
+A stage measures its wall time and counts the bytes and items it processed. When it finishes it
+sends one record to every registered sink. A sink is any callable that takes the record dict.
+The module provides logging, JSON-lines, console and running-total sinks.
+
+With no sinks registered, stage() returns a shared no-op stage, so instrumented code costs one
+function call per stage. A thread can also watch() its own stages lap by lap, which is how the
+GUI follows the progress of a background job and cancels it.
+
+Example:
+    import instrumentation
+    instrumentation.add_sink(instrumentation.JsonLinesSink("metrics.jsonl"))
+    with instrumentation.stage("image", "encode", "embed") as s:
+        ...
+        s.add(bytes=len(payload))
+"""
+import contextlib
+import json
+import logging
+import threading
+import time
+
+_SINKS = []
+_LOCAL = threading.local()  # The current thread's watcher, see watch()
+
+
+def add_sink(sink):
+    """Register a callable that receives every stage record."""
+    _SINKS.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    if sink in _SINKS:
+        _SINKS.remove(sink)
+
+
+def clear_sinks():
+    del _SINKS[:]
+
+
+def enabled():
+    return bool(_SINKS)
+
+
+def emit(record):
+    for sink in list(_SINKS):
+        sink(record)
+
+
+@contextlib.contextmanager
+def watch(callback):
+    """Call callback(record) every time a stage started in this thread makes progress.
+
+    Unlike a sink, a watcher sees each lap as it happens, and only for stages of its own thread.
+    An exception raised by the callback propagates out of the instrumented code, so a watcher
+    can stop the work it is watching.
+    """
+    previous = getattr(_LOCAL, "watcher", None)
+    _LOCAL.watcher = callback
+    try:
+        yield
+    finally:
+        _LOCAL.watcher = previous
+
+
+class Stage:
+    """A named stage of one encode or decode, timed as a whole or over several laps."""
+
+    def __init__(self, modality, action, name, fields, watcher=None):
+        self.record = {"modality": modality, "action": action, "stage": name,
+                       "seconds": 0.0, "bytes": 0, "count": 0, **fields}
+        self.lock = threading.Lock()  # Laps may be added from worker threads
+        self.started = None
+        self.watcher = watcher  # Kept from the creating thread, so laps added by pool threads reach it too
+
+    def add(self, seconds=0.0, bytes=0, count=0):
+        with self.lock:
+            self.record["seconds"] += seconds
+            self.record["bytes"] += bytes
+            self.record["count"] += count
+        if self.watcher is not None:
+            self.watcher(self.record)
+
+    @contextlib.contextmanager
+    def lap(self, bytes=0, count=0):
+        """Time one piece of the stage without finishing it."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(time.perf_counter() - start, bytes, count)
+
+    def done(self, **fields):
+        """Finish the stage and send its record to the sinks."""
+        self.record.update(fields, time=time.time())
+        emit(self.record)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.add(time.perf_counter() - self.started)
+        self.done(**({"error": exc_type.__name__} if exc_type else {}))
+
+
+class _NullStage:
+    """Stand-in used while no sink or watcher is registered; every method does nothing."""
+
+    def add(self, seconds=0.0, bytes=0, count=0):
+        pass
+
+    def lap(self, bytes=0, count=0):
+        return _NULL_CONTEXT
+
+    def done(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+_NULL_CONTEXT = contextlib.nullcontext(_NULL_STAGE)
+
+
+def stage(modality, action, name, **fields):
+    """Return a stage to use as a context manager (timed once) or with lap()/done().
+
+    A total field, where the code knows it up front, is the count the stage will reach when done.
+    """
+    watcher = getattr(_LOCAL, "watcher", None)
+    if not _SINKS and watcher is None:
+        return _NULL_STAGE
+    return Stage(modality, action, name, fields, watcher)
+
+
+class LoggingSink:
+    """Write each record to a logger."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("stego")
+        self.level = level
+
+    def __call__(self, record):
+        self.logger.log(self.level, "%s %s %s: %.4fs, %d bytes, %d items", record["modality"], record["action"],
+                        record["stage"], record["seconds"], record["bytes"], record["count"])
+
+
+class JsonLinesSink:
+    """Append each record as one JSON line to a file, so several processes can share it."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock, open(self.path, "a") as file:
+            file.write(line)
+
+
+def print_sink(record):
+    """Print a one-line progress report for each record."""
+    counts = f", {record['count']} items" if record["count"] else ""
+    size = f", {record['bytes'] / 1e6:.2f} MB" if record["bytes"] else ""
+    print(f"{record['modality']} {record['action']}: {record['stage']} took {record['seconds']:.3f}s{size}{counts}")
+
+
+class StageTotals:
+    """Keep running totals of seconds, bytes and items per (modality, action, stage)."""
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, record):
+        key = (record["modality"], record["action"], record["stage"])
+        with self.lock:
+            total = self.totals.setdefault(key, {"calls": 0, "seconds": 0.0, "bytes": 0, "count": 0})
+            total["calls"] += 1
+            total["seconds"] += record["seconds"]
+            total["bytes"] += record["bytes"]
+            total["count"] += record["count"]
+
+    def summary(self):
+        """Return the totals as records, slowest stage first."""
+        with self.lock:
+            rows = [{"modality": m, "action": a, "stage": s, **total} for (m, a, s), total in self.totals.items()]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
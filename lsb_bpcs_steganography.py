@@ -1,14 +1,18 @@
 import tkinter as tk  # Import the tkinter library for GUI
 from tkinter import filedialog, messagebox  # Import specific components from tkinter
 from PIL import Image, ImageTk, UnidentifiedImageError  # Import PIL for image handling
-import wave  # Import wave for audio file handling
 import os  # Import os for operating system interactions
-import numpy as np  # Import numpy for array manipulation
+import instrumentation
+import plugins  # BPCS handling lives in the bpcs modality plugin
+import preview_cache
+
+PREVIEW_SIZE = (250, 250)
 
 class SteganographyApp:
     def __init__(self, root):
         self.root = root  # Set the root window
         self.root.title("LSB & BPCS Steganography and Steganalysis")  # Set the title of the window
+        self.previews = preview_cache.PreviewCache()  # Thumbnails of recently shown covers and stego images
         
         # Create a frame to hold the widgets
         self.frame = tk.Frame(root)
@@ -65,8 +69,7 @@ class SteganographyApp:
             # Check if the selected file is an image
             if self.cover_path.lower().endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
                 print(f"Selected cover file path: {self.cover_path}")  # Debugging statement
-                image = Image.open(self.cover_path)  # Open the image
-                image.thumbnail((250, 250))  # Resize the image
+                image = self.previews.get(self.cover_path, PREVIEW_SIZE)  # Decoded at reduced scale, or straight from the cache
                 self.cover_image = ImageTk.PhotoImage(image)  # Convert the image to PhotoImage
                 self.cover_label.config(image=self.cover_image)  # Display the image in the label
             elif self.cover_path.lower().endswith('.wav'):
@@ -101,7 +104,7 @@ class SteganographyApp:
                 else:
                     break
         
-        stego_image_path = cover_image_path.split('.')[0] + '_stego.png'  # Create the path for the stego image
+        stego_image_path = os.path.splitext(cover_image_path)[0] + '_stego.png'  # Create the path for the stego image
         image.save(stego_image_path)  # Save the stego image
         return stego_image_path
 
@@ -125,41 +128,11 @@ class SteganographyApp:
         return decoded_text.split(chr(255) * 2)[0]
 
     def encode_audio(self, cover_audio_path, payload_text, num_lsb):
-        with wave.open(cover_audio_path, 'rb') as audio:
-            params = audio.getparams()  # Get audio parameters
-            frames = bytearray(list(audio.readframes(audio.getnframes())))  # Read audio frames
-        
-        binary_payload = ''.join(format(ord(char), '08b') for char in payload_text) + '1111111111111110'  # Convert the payload text to binary and add an end delimiter
-        binary_index = 0
-        
-        for i in range(len(frames)):
-            if binary_index < len(binary_payload):
-                frames[i] = frames[i] & ~(1 << (num_lsb - 1)) | (int(binary_payload[binary_index]) << (num_lsb - 1))  # Modify the LSB
-                binary_index += 1
-            else:
-                break
-        
-        stego_audio_path = cover_audio_path.split('.')[0] + '_stego.wav'  # Create the path for the stego audio
-        with wave.open(stego_audio_path, 'wb') as audio:
-            audio.setparams(params)  # Set audio parameters
-            audio.writeframes(frames)  # Write the modified frames
-        
-        return stego_audio_path
+        # Stream the WAV through the audio plugin in fixed-size blocks
+        return plugins.get_plugin("audio").encode(cover_audio_path, payload_text, num_lsb)
 
     def decode_audio(self, stego_audio_path, num_lsb):
-        with wave.open(stego_audio_path, 'rb') as audio:
-            frames = bytearray(list(audio.readframes(audio.getnframes())))  # Read audio frames
-        
-        binary_payload = ''
-        
-        for frame in frames:
-            binary_payload += str((frame >> (num_lsb - 1)) & 1)  # Extract the LSB
-        
-        # Split the binary payload into bytes and convert to characters
-        byte_payload = [binary_payload[i:i+8] for i in range(0, len(binary_payload), 8)]
-        decoded_text = ''.join(chr(int(byte, 2)) for byte in byte_payload)
-        
-        return decoded_text.split(chr(255) * 2)[0]  # Find the end delimiter and return the payload
+        return plugins.get_plugin("audio").decode(stego_audio_path, num_lsb).decode('utf-8', errors='replace')
 
     def encode_lsb(self):
         # Check if both cover and payload files are selected
@@ -168,8 +141,7 @@ class SteganographyApp:
                 payload_text = file.read()  # Read the payload text
             if self.cover_path.endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
                 stego_image_path = self.encode_image(self.cover_path, payload_text, self.lsb_var.get())  # Encode the payload into the image
-                stego_image = Image.open(stego_image_path)  # Open the stego image
-                stego_image.thumbnail((250, 250))  # Resize the stego image
+                stego_image = self.previews.get(stego_image_path, PREVIEW_SIZE)  # Thumbnail of the stego image
                 self.stego_image = ImageTk.PhotoImage(stego_image)  # Convert the stego image to PhotoImage
                 self.stego_label.config(image=self.stego_image)  # Display the stego image in the label
                 messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_image_path}")  # Show a success message
@@ -197,62 +169,14 @@ class SteganographyApp:
 
     def calculate_complexity(self, block):
         # Calculate the complexity of an 8x8 block
-        transitions = np.sum(np.abs(np.diff(block))) + np.sum(np.abs(np.diff(block, axis=0)))
-        return transitions
+        return plugins.get_plugin("bpcs").calculate_complexity(block)
 
     def embed_payload_into_image(self, image_path, payload_text):
-        image = Image.open(image_path).convert('L')  # Convert image to grayscale
-        image_data = np.array(image)
-        
-        binary_image = np.unpackbits(image_data, axis=1)  # Convert to binary
-        payload_binary = ''.join(format(ord(char), '08b') for char in payload_text)
-        payload_binary += '00000000' * 8  # End delimiter
-        
-        height, width = binary_image.shape
-        block_size = 8
-        payload_index = 0
-        
-        for i in range(0, height, block_size):
-            for j in range(0, width, block_size):
-                block = binary_image[i:i+block_size, j:j+block_size]
-                if self.calculate_complexity(block) > 30:  # Threshold for complexity
-                    for k in range(block_size):
-                        for l in range(block_size):
-                            if payload_index < len(payload_binary):
-                                block[k, l] = int(payload_binary[payload_index])
-                                payload_index += 1
-                            else:
-                                break
-                binary_image[i:i+block_size, j:j+block_size] = block
-                if payload_index >= len(payload_binary):
-                    break
-        
-        stego_image_data = np.packbits(binary_image)
-        stego_image = Image.fromarray(stego_image_data)
-        stego_image.save('stego_image_bpcs.png')
-        return 'stego_image_bpcs.png'
+        return plugins.get_plugin("bpcs").encode(image_path, payload_text)
 
     def decode_payload_from_image(self, image_path):
-        image = Image.open(image_path).convert('L')
-        image_data = np.array(image)
-        binary_image = np.unpackbits(image_data, axis=1)
-        
-        height, width = binary_image.shape
-        block_size = 8
-        binary_payload = ''
-        
-        for i in range(0, height, block_size):
-            for j in range(0, width, block_size):
-                block = binary_image[i:i+block_size, j:j+block_size]
-                if self.calculate_complexity(block) > 30:  # Threshold for complexity
-                    for k in range(block_size):
-                        for l in range(block_size):
-                            binary_payload += str(block[k, l])
-        
-        byte_payload = [binary_payload[i:i+8] for i in range(0, len(binary_payload), 8)]
-        decoded_text = ''.join(chr(int(byte, 2)) for byte in byte_payload)
-        
-        return decoded_text.split(chr(255) * 2)[0]  # Find the end delimiter and return the payload
+        decoded_data = plugins.get_plugin("bpcs").decode(image_path)
+        return None if decoded_data is None else decoded_data.decode('utf-8', errors='replace')
 
     def encode_bpcs(self):
         # Check if both cover and payload files are selected
@@ -261,8 +185,7 @@ class SteganographyApp:
                 payload_text = file.read()  # Read the payload text
             if self.cover_path.endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
                 stego_image_path = self.embed_payload_into_image(self.cover_path, payload_text)  # Encode the payload into the image using BPCS
-                stego_image = Image.open(stego_image_path)  # Open the stego image
-                stego_image.thumbnail((250, 250))  # Resize the stego image
+                stego_image = self.previews.get(stego_image_path, PREVIEW_SIZE)  # Thumbnail of the stego image
                 self.stego_image = ImageTk.PhotoImage(stego_image)  # Convert the stego image to PhotoImage
                 self.stego_label.config(image=self.stego_image)  # Display the stego image in the label
                 messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_image_path}")  # Show a success message
@@ -283,6 +206,7 @@ class SteganographyApp:
             messagebox.showwarning("Error", "Please select a cover file")  # Show an error message if the cover file is not selected
 
 if __name__ == "__main__":
+    instrumentation.add_sink(instrumentation.print_sink)  # Report each encode/decode stage on the console
     root = tk.Tk()  # Create the main window
     app = SteganographyApp(root)  # Create an instance of the SteganographyApp class
     root.mainloop()  # Run the main loop
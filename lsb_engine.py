@@ -0,0 +1,246 @@
+import hashlib
+from functools import lru_cache
+
+import numpy as np  # Import numpy for array manipulation
+import instrumentation
+import payload_codec
+import stego_header
+
+# Sentinels used by the original image format to mark the end of the payload
+IMAGE_END_MARKER = "====="
+IMAGE_STOP_MARKER = b"===="
+SCATTER_CACHE_SIZE = 8  # Permutations kept; 4 bytes per cover element each
+
+
+def bytes_to_bits(data):
+    """Convert bytes to a flat uint8 array of bits, most significant bit of each byte first."""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+
+def bits_to_bytes(bits):
+    """Pack a flat bit array back into bytes, dropping any trailing partial byte."""
+    return np.packbits(bits[:len(bits) // 8 * 8]).tobytes()
+
+
+def lsb_mask(num_lsb):
+    """Return the uint8 mask that keeps the high bits and clears the num_lsb low bits."""
+    if not 1 <= num_lsb <= 8:
+        raise ValueError("Number of LSBs must be between 1 and 8.")
+    return np.uint8(0xFF ^ ((1 << num_lsb) - 1))
+
+
+def group_bits(bits, num_lsb):
+    """Pack a bit array into num_lsb-wide values, most significant bit first.
+
+    A short final group is zero padded on the right, so every value fits in num_lsb bits.
+    """
+    pad = (-len(bits)) % num_lsb
+    if pad:
+        bits = np.concatenate([bits, np.zeros(pad, dtype=np.uint8)])
+    groups = bits.reshape(-1, num_lsb)
+    return np.packbits(groups, axis=1)[:, 0] >> (8 - num_lsb)  # packbits left-aligns each group in a byte
+
+
+def embed_lsb(flat, bits, num_lsb, shift_tail=False):
+    """Write bits into the num_lsb low bits of a flat uint8 array in place.
+
+    Returns the number of array elements that were modified.
+    """
+    mask = lsb_mask(num_lsb)
+    values = group_bits(bits, num_lsb)
+    count = len(values)
+    if count > flat.size:
+        raise ValueError("Insufficient bytes, need bigger cover, smaller payload or more LSB.")
+    original_last = int(flat[count - 1]) if count else 0
+    flat[:count] = (flat[:count] & mask) | values
+    tail = len(bits) % num_lsb
+    if shift_tail and tail:
+        # The per-pixel encoder joined a short final chunk onto the kept high bits,
+        # which shifts them down; reproduce that so stego images stay bit-identical
+        chunk = int(values[-1]) >> (num_lsb - tail)
+        flat[count - 1] = ((original_last >> num_lsb) << tail) | chunk
+    return count
+
+
+def extract_lsb(flat, num_lsb, num_bits=None):
+    """Read the num_lsb low bits of each element of a flat uint8 array as a flat bit array."""
+    mask = ~lsb_mask(num_lsb)  # Keep only the low bits
+    if num_bits is not None:
+        flat = flat[:-(-num_bits // num_lsb)]  # Only the elements that hold the requested bits
+    bits = np.unpackbits((flat & mask)[:, None], axis=1)[:, 8 - num_lsb:].reshape(-1)
+    return bits if num_bits is None else bits[:num_bits]
+
+
+def find_zero_run(window, run, offset=0, step=1):
+    """Find the first run of zero bits in window, as the bit terminators are searched for.
+
+    Only runs ending at a global position (offset + index) that is a multiple of step are
+    counted, matching decoders that check for the terminator after each group of step bits.
+    Returns the global end position of the first run, or None.
+    """
+    if len(window) < run:
+        return None
+    ones = np.concatenate([[0], np.cumsum(window, dtype=np.int64)])  # Ones seen before each position
+    ends = np.arange(run, len(window) + 1)
+    hits = np.flatnonzero(((ones[ends] - ones[ends - run]) == 0) & ((offset + ends) % step == 0))
+    return offset + int(ends[hits[0]]) if hits.size else None
+
+
+def payload_capacity(num_elements, num_lsb):
+    """Return how many payload bytes fit in a cover of num_elements values after the header."""
+    return max(num_elements - stego_header.HEADER_BITS, 0) * num_lsb // 8
+
+
+@lru_cache(maxsize=SCATTER_CACHE_SIZE)
+def scatter_positions(key, num_elements, num_lsb):
+    """Return a key-seeded permutation of the payload elements of a cover with num_elements values.
+
+    The header elements are left out, so the header stays where decoders look for it. The array
+    is cached (and read-only), so same-sized covers encoded or decoded with the same key and LSB
+    count reuse it instead of shuffling again.
+    """
+    seed = hashlib.sha256(f"{key}\0{num_lsb}".encode()).digest()
+    size = max(num_elements - stego_header.HEADER_BITS, 0)
+    positions = np.random.default_rng(np.frombuffer(seed, dtype=np.uint32)).permutation(size)
+    positions = positions.astype(np.uint32 if size <= 1 << 32 else np.int64)
+    positions.setflags(write=False)
+    return positions
+
+
+def embed_payload(flat, payload, num_lsb, modality, key=None):
+    """Write the header and payload bytes into a flat uint8 array in place.
+
+    The header takes one LSB of the first HEADER_BITS elements, the payload follows with num_lsb,
+    in order or, with a key, at the key's scatter_positions().
+    Returns the number of array elements that were modified.
+    """
+    if len(payload) > payload_capacity(flat.size, num_lsb):
+        raise ValueError("Insufficient bytes, need bigger cover, smaller payload or more LSB.")
+    header = stego_header.pack_header(modality, num_lsb, len(payload))
+    embed_lsb(flat, bytes_to_bits(header), stego_header.HEADER_LSB)
+    body = flat[stego_header.HEADER_BITS:]
+    if key is None:
+        return stego_header.HEADER_BITS + embed_lsb(body, bytes_to_bits(payload), num_lsb)
+    values = group_bits(bytes_to_bits(payload), num_lsb)
+    positions = scatter_positions(key, flat.size, num_lsb)[:len(values)]
+    body[positions] = (body[positions] & lsb_mask(num_lsb)) | values  # One gather and one scatter
+    return stego_header.HEADER_BITS + len(values)
+
+
+def read_header(flat):
+    """Read the stego header from the start of a flat uint8 array, or None if there is none."""
+    if flat.size < stego_header.HEADER_BITS:
+        return None
+    bits = extract_lsb(flat[:stego_header.HEADER_BITS], stego_header.HEADER_LSB)
+    return stego_header.unpack_header(bits_to_bytes(bits))
+
+
+def extract_payload(flat, header, key=None):
+    """Read exactly the payload bytes described by header, touching only the elements they use."""
+    body = flat[stego_header.HEADER_BITS:]
+    if header.length * 8 > body.size * header.num_lsb:
+        raise ValueError("Header payload length exceeds the cover capacity.")
+    if key is not None:
+        count = -(-header.length * 8 // header.num_lsb)
+        body = body[scatter_positions(key, flat.size, header.num_lsb)[:count]]  # Gather the scattered elements
+    return bits_to_bytes(extract_lsb(body, header.num_lsb, header.length * 8))
+
+
+def payload_plan(payload, num_lsb, modality):
+    """Return the (first element, values, LSB count) regions that carry the header and payload.
+
+    A plan lets covers that are processed in blocks or strips embed each piece independently.
+    """
+    header = stego_header.pack_header(modality, num_lsb, len(payload))
+    header_values = group_bits(bytes_to_bits(header), stego_header.HEADER_LSB)
+    payload_values = group_bits(bytes_to_bits(payload), num_lsb)
+    return [(0, header_values, stego_header.HEADER_LSB), (stego_header.HEADER_BITS, payload_values, num_lsb)]
+
+
+def plan_end(plan):
+    """Return the element index after the last one a plan modifies."""
+    return max(start + len(values) for start, values, _ in plan)
+
+
+def apply_plan(flat, first_element, plan):
+    """Apply the parts of a plan that fall inside a block of elements starting at first_element."""
+    for start, values, num_lsb in plan:
+        low = max(start, first_element)
+        high = min(start + len(values), first_element + len(flat))
+        if low < high:
+            block = flat[low - first_element:high - first_element]
+            block[:] = (block & lsb_mask(num_lsb)) | values[low - start:high - start]
+
+
+def iter_chunks(flat, chunk_elements):
+    """Yield consecutive slices of a flat array."""
+    for start in range(0, flat.size, chunk_elements):
+        yield flat[start:start + chunk_elements]
+
+
+def scan_legacy_payload(chunks, num_lsb, marker):
+    """Scan an iterable of flat uint8 arrays for a sentinel-terminated payload.
+
+    Stops pulling chunks as soon as the marker is found; returns everything if it never appears.
+    """
+    found = []
+    carry = b""  # Tail of the data so far, in case the marker straddles two chunks
+    spare = np.zeros(0, dtype=np.uint8)  # Bits left over when a chunk does not end on a byte
+    for values in chunks:
+        bits = np.concatenate([spare, extract_lsb(values, num_lsb)])
+        whole = len(bits) // 8 * 8
+        spare = bits[whole:]
+        chunk = bits_to_bytes(bits[:whole])
+        window = carry + chunk
+        end = window.find(marker)
+        if end != -1:
+            return b"".join(found)[:-len(carry) or None] + window[:end]
+        found.append(chunk)
+        carry = window[-(len(marker) - 1):]
+    return b"".join(found)
+
+
+def find_legacy_payload(flat, num_lsb, marker, chunk_elements=1 << 20):
+    """Scan a flat uint8 array in chunks for a sentinel-terminated payload."""
+    return scan_legacy_payload(iter_chunks(flat, chunk_elements), num_lsb, marker)
+
+
+def encode_image_array(image, payload, num_lsb, legacy=False, codec=payload_codec.CODEC_NONE, key=None):
+    """Embed payload bytes into a cv2 image array in place.
+
+    By default the payload is packed with the given codec and preceded by a stego header; with
+    legacy=True it is stored as is and followed by the original end marker instead. With a key
+    the payload bits are scattered over the image rather than filling it from the top.
+    """
+    flat = image.reshape(-1)
+    if legacy:
+        # The original encoder wrote each character as its 8-bit code
+        data = payload.encode('latin-1', errors='replace') if isinstance(payload, str) else payload
+        embed_lsb(flat, bytes_to_bits(data + IMAGE_END_MARKER.encode()), num_lsb, shift_tail=True)
+    else:
+        with instrumentation.stage("image", "encode", "bit_prep") as stage:
+            stored = payload_codec.pack_payload(payload, codec)
+            stage.add(bytes=len(stored))
+        with instrumentation.stage("image", "encode", "embed") as stage:
+            stage.add(bytes=len(stored), count=embed_payload(flat, stored, num_lsb, stego_header.MODALITY_IMAGE, key))
+    return image
+
+
+def decode_image_array(image, num_lsb, key=None):
+    """Extract the payload bytes hidden in a cv2 image array.
+
+    Images with a stego header are read up to the recorded length using the recorded LSB count;
+    anything else is treated as the legacy format and read with num_lsb up to the end marker.
+    """
+    flat = image.reshape(-1)
+    with instrumentation.stage("image", "decode", "extract") as stage:
+        header = read_header(flat)
+        if header is None:
+            stored = find_legacy_payload(flat, num_lsb, IMAGE_STOP_MARKER)
+        else:
+            stored = extract_payload(flat, header, key)
+        stage.add(bytes=len(stored))
+    if header is None:
+        return stored
+    with instrumentation.stage("image", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
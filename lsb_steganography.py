@@ -1,16 +1,13 @@
 import tkinter as tk  # Import the tkinter library for GUI
-from tkinter import filedialog, messagebox  # Import specific components from tkinter
-from tkinterdnd2 import DND_FILES, TkinterDnD
-from PIL import Image, ImageTk, UnidentifiedImageError  # Import PIL for image handling
-import wave  # Import wave for audio file handling
+from tkinter import filedialog, messagebox, ttk  # Import specific components from tkinter
+from PIL import ImageTk, UnidentifiedImageError  # Import PIL for image handling
 import os  # Import os for operating system interactions
-import cv2, numpy as np
-import vlc
-from moviepy.editor import VideoFileClip
-import shutil, stat
-from pydub import AudioSegment
-import soundfile as sf
-import pygame
+import background_jobs
+import capacity_planner
+import instrumentation
+import plugins  # Modality plugins import cv2 and moviepy only when first needed
+import preview_cache
+import video_stream
 
 class SteganographyApp:
     def __init__(self, root):
@@ -19,9 +16,8 @@ class SteganographyApp:
         self.root.geometry("1200x800")
         self.root.minsize(1200, 800)
         self.root.maxsize(1200, 800)
-
-        # Initialize the mixer module
-        pygame.mixer.init()
+        self.previews = preview_cache.PreviewCache()  # Thumbnails of recently shown covers and stego images
+        self.vlc = None  # VLC instance shared by every video player, created on the first video
 
         # Create a frame to hold the widgets
         self.frame = tk.Frame(root)
@@ -35,6 +31,14 @@ class SteganographyApp:
         self.payload_button = tk.Button(self.frame, text="Select Payload File", command=self.load_payload)
         self.payload_button.grid(row=0, column=1, padx=10)  # Place the button in the grid with padding
 
+        # Optional key that scatters image and audio payload bits in a key-seeded order
+        self.key_label = tk.Label(self.frame, text="Key (optional):")
+        self.key_label.grid(row=0, column=2, padx=10)
+
+        self.key_var = tk.StringVar()
+        self.key_entry = tk.Entry(self.frame, textvariable=self.key_var, show="*")
+        self.key_entry.grid(row=0, column=3, padx=10)
+
         # Label and spinbox for selecting the number of LSBs
         self.lsb_label = tk.Label(self.frame, text="Number of LSBs:")
         self.lsb_label.grid(row=1, column=0, pady=10)  # Place the label in the grid with padding
@@ -43,6 +47,22 @@ class SteganographyApp:
         self.lsb_spinbox = tk.Spinbox(self.frame, from_=1, to=8, textvariable=self.lsb_var)
         self.lsb_spinbox.grid(row=1, column=1, pady=10)  # Place the spinbox in the grid with padding
 
+        # Label and menu for choosing how the payload is compressed before embedding
+        self.codec_label = tk.Label(self.frame, text="Compression:")
+        self.codec_label.grid(row=1, column=2, pady=10)
+
+        self.codec_var = tk.StringVar(value="none")
+        self.codec_menu = tk.OptionMenu(self.frame, self.codec_var, "none", "zlib", "lzma")
+        self.codec_menu.grid(row=1, column=3, pady=10)
+
+        # Label and menu for choosing the lossless codec stego videos are written with
+        self.video_codec_label = tk.Label(self.frame, text="Video codec:")
+        self.video_codec_label.grid(row=2, column=2, pady=10)
+
+        self.video_codec_var = tk.StringVar(value=video_stream.DEFAULT_VIDEO_CODEC)
+        self.video_codec_menu = tk.OptionMenu(self.frame, self.video_codec_var, *video_stream.VIDEO_CODECS)
+        self.video_codec_menu.grid(row=2, column=3, pady=10)
+
         # Button to encode the payload into the cover file
         self.encode_button = tk.Button(self.frame, text="Encode", command=self.encode)
         self.encode_button.grid(row=2, column=0, pady=10)  # Place the button in the grid with padding
@@ -51,6 +71,12 @@ class SteganographyApp:
         self.decode_button = tk.Button(self.frame, text="Decode", command=self.decode)
         self.decode_button.grid(row=2, column=1, pady=10)  # Place the button in the grid with padding
 
+        # Frame listing the running jobs, each with a progress bar and a Cancel button
+        self.jobs_frame = tk.Frame(root)
+        self.jobs_frame.pack()
+        self.jobs = {}  # job -> (cover path, action, progress row, label, progress bar)
+        self.job_count = 0
+
         # Label to display the cover image
         self.cover_label = tk.Label(root)
         self.cover_label.pack(side="left", padx=20)  # Pack the label with padding
@@ -60,6 +86,7 @@ class SteganographyApp:
         self.stego_label.pack(side="right", padx=20)  # Pack the label with padding
 
         # Add drag-and-drop functionality
+        from tkinterdnd2 import DND_FILES
         self.root.drop_target_register(DND_FILES)
         self.root.dnd_bind('<<Drop>>', self.drop)
 
@@ -105,14 +132,13 @@ class SteganographyApp:
             # Check if the selected file is an image
             if self.cover_path.lower().endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
                 print(f"Selected cover file path: {self.cover_path}")  # Debugging statement
-                image = Image.open(self.cover_path)  # Open the image
-                image.thumbnail((500, 500))  # Resize the image
+                image = self.previews.get(self.cover_path)  # Decoded at reduced scale, or straight from the cache
                 self.cover_image = ImageTk.PhotoImage(image)  # Convert the image to PhotoImage
                 self.cover_label.config(image=self.cover_image)  # Display the image in the label
             elif self.cover_path.lower().endswith(('.mp4', '.mkv')):
                 print(f"Selected cover file path: {self.cover_path}")  # Debugging statement
-                # Create a VLC instance
-                instance = vlc.Instance()
+                # Reuse the shared VLC instance
+                instance = self.vlc_instance()
                 # Create a VLC player
                 self.player = instance.media_player_new()
                 # Create a new Media instance
@@ -151,313 +177,165 @@ class SteganographyApp:
 
     def load_payload(self):
         # Open a file dialog to select the payload file
-        self.payload_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt")])
+        self.payload_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
         if self.payload_path:
             self.load_payload_from_path(self.payload_path)
 
-    def to_bin(self, data):  # Convert data to binary format as a string
-        if isinstance(data, str):
-            return ''.join([format(ord(i), "08b") for i in data])
-        elif isinstance(data, bytes) or isinstance(data, np.ndarray):
-            return [format(i, "08b") for i in data]
-        elif isinstance(data, int) or isinstance(data, np.uint8):
-            return format(data, "08b")
-        else:
-            raise TypeError("Type not supported.")
-
-    def encode_image(self, cover_image_path, payload_text, num_lsb):
-        print("Encoding image...")
-        # read the image
-        image = cv2.imread(cover_image_path)
-        # maximum bytes to encode
-        n_bytes = (image.shape[0] * image.shape[1] * image.shape[2] * num_lsb) // 8
-        if len(payload_text) > n_bytes:
-            messagebox.showwarning("Error", "Insufficient bytes, need bigger image, smaller payload or more LSB.")
-            raise ValueError("Error: Insufficient bytes, need bigger image, smaller payload or more LSB.")
-        # add stopping criteria
-        payload_text += "====="
-        data_index = 0
-        # convert data to binary
-        print("Converting to binary...")
-        binary_payload_text = self.to_bin(payload_text)
-        data_len = len(binary_payload_text)
-
-        print("Encoding image... (Please wait)")
-        for row in image:
-            for pixel in row:
-                # convert RGB values to binary format
-                r, g, b = map(lambda x: self.to_bin(x), pixel)
-                # modify the least significant bit only if there is still data to store
-                if data_index < data_len:
-                    # least significant red pixel bit
-                    pixel[0] = int(r[:-num_lsb] + binary_payload_text[data_index:data_index + num_lsb], 2)
-                    data_index += num_lsb
-                if data_index < data_len:  # least significant green pixel bit
-                    pixel[1] = int(g[:-num_lsb] + binary_payload_text[data_index:data_index + num_lsb], 2)
-                    data_index += num_lsb
-                if data_index < data_len:  # least significant blue pixel bit
-                    pixel[2] = int(b[:-num_lsb] + binary_payload_text[data_index:data_index + num_lsb], 2)
-                    data_index += num_lsb
-                if data_index >= data_len:
-                    break
-
-        stego_image_path = cover_image_path.split('.')[0] + '_stego.png'  # Create the path for the stego image
-        cv2.imwrite(stego_image_path, image)
-        print("Encoding completed!")
+    def encode_image(self, cover_image_path, payload, num_lsb, codec="none", key=None, tag=""):
+        plugin = plugins.create_plugin("image", codec=codec, key=key, stego_suffix="_stego" + tag,
+                                       preview_size=preview_cache.PREVIEW_SIZE)
+        stego_image_path = plugin.encode(cover_image_path, payload, num_lsb)
+        if plugin.preview is not None:
+            self.previews.put(stego_image_path, plugin.preview)  # Made from the encoded array, so nothing is re-read
         return stego_image_path
 
-    def to_bin(self, data):
-        """Convert a string to binary format, each character to its ASCII binary representation."""
-        if isinstance(data, str):  # Check if the input is string
-            return ''.join([bin(ord(char))[2:].zfill(8) for char in data])
-        else:
-            return bin(data)[2:].zfill(8)
+    def decoded_output_path(self, stego_path, tag=""):
+        """Name the decoded text after the stego file, so decodes of different files never share it."""
+        return os.path.splitext(stego_path)[0] + "_decoded" + tag + ".txt"
 
-    def complete_decoding(self, decoded_data):
+    def complete_decoding(self, decoded_data, output_path):
         """Handle the completion of the decoding process."""
-        with open("decodedimage_text.txt", "w") as file:
+        with open(output_path, "wb") as file:
             file.write(decoded_data)
-        print("Decoding completed!")
-        return "Check decodedimage_text.txt for the decoded text."
-
-    def decode_image(self, stego_image_path, num_lsb):
-        # Read the image
-        print("Reading image..")
-        image = cv2.imread(stego_image_path)
-        binary_data = ""
-        print("Decoding image... (Please wait)")
-        for row in image:
-            for pixel in row:
-                # Convert RGB values to binary format
-                r, g, b = map(lambda x: self.to_bin(x), pixel)
-                # Extract the least significant bits
-                for color in [r, g, b]:
-                    binary_data += color[-num_lsb:]
-        
-        # Split by 8-bits
-        print("Splitting binary...")
-        all_bytes = [binary_data[i: i + 8] for i in range(0, len(binary_data), 8)]
-        
-        # Convert from bits to characters
-        print("Converting binary to characters...")
-        decoded_data = ""
-        for byte in all_bytes:
-            decoded_data += chr(int(byte, 2))
-            # Check for specific endings and complete decoding if found
-            if decoded_data.endswith("====="):
-                return self.complete_decoding(decoded_data[:-5])
-            if decoded_data.endswith("===="):
-                return self.complete_decoding(decoded_data[:-4])
-
-        # If no specific ending was found, write and return anyway
-        return self.complete_decoding(decoded_data)
-
-
-    def encode_video(self, cover_video_path, payload_text, num_lsb):
-        try:
-            print("Starting video encoding...")
-            n_lsb = int(num_lsb)
-            stego_video_path = self.encode_lsb(cover_video_path, payload_text, n_lsb)
-            return stego_video_path
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-
-    # Function to extract frames using moviepy and PIL
-    def frame_extract(self, video_path):
-        if not os.path.exists("./temp"):
-            os.makedirs("temp")
-        temp_folder = "./temp/"
-        video_object = VideoFileClip(video_path)
-        for index, frame in enumerate(video_object.iter_frames()):
-            print(f"Extracting frames... (Frame {index})")
-            img = Image.fromarray(frame, 'RGB')
-            img.save(f'{temp_folder}{index}.png')
-
-    # Function to encode text into video frames using LSB and then reassemble using ffmpeg
-    def encode_lsb(self, video_path, text, n_lsb):
-        self.frame_extract(video_path)
-
-        temp_folder = "./temp/"
-        # frames = sorted([f for f in os.listdir(temp_folder) if f.endswith('.png')])
-        frames = sorted([f for f in os.listdir(temp_folder) if f.endswith('.png')], key=lambda f: int(f.split('.')[0]))
-
-        text_bits = ''.join([format(ord(char), '08b') for char in text])
-        text_bits += '00000000' * 8  # Adding 8 null bytes to signify the end of the message
-        bit_index = 0
-
-        for frame_idx, frame_file in enumerate(frames):
-            frame = cv2.imread(os.path.join(temp_folder, frame_file))
-            if bit_index >= len(text_bits):
-                break  # Stop encoding if all text bits are encoded
-            print("Encoding frame {}...".format(frame_file))
-            # print(frame_file)
-            for i in range(frame.shape[0]):
-                for j in range(frame.shape[1]):
-                    for k in range(3):  # Iterate over the BGR channels
-                        if bit_index < len(text_bits):
-                            frame[i, j, k] = (frame[i, j, k] & ~((1 << n_lsb) - 1)) | int(text_bits[bit_index:bit_index + n_lsb], 2)
-                            bit_index += n_lsb
-
-            cv2.imwrite(os.path.join(temp_folder, frame_file), frame)
-
-        fps = VideoFileClip(video_path).fps
-
-        print("Extracting audio...")
-        os.system(f'ffmpeg -i {video_path} -q:a 0 -map a temp/audio.mp3 -y -loglevel quiet')
-        stego_video_path = video_path.split('.')[0] + '_stego.mkv'
-
-        print("Combining new video and audio...")
-        os.system(f'ffmpeg -framerate {fps} -i {temp_folder}%d.png -codec copy -y temp/video-only.mkv -loglevel quiet')
-        os.system(f'ffmpeg -i temp/video-only.mkv -i temp/audio.mp3 -codec copy -y {stego_video_path} -loglevel quiet')
-
-        print("Deleting temp folder...")
-        if os.path.exists("./temp"):
-            try:
-                shutil.rmtree("./temp", onerror=self.remove_readonly)
-            except OSError as e:
-                print("Error: %s : %s" % ("./temp", e.strerror))
-
-        print("Encoding completed!")
-        return stego_video_path
-
-    def remove_readonly(self, func, path, _):
-        os.chmod(path, stat.S_IWRITE)
-        func(path)
-
-    def decode_video(self, stego_video_path, num_lsb):
-        try:
-            print("Starting video decoding...")
-            n_lsb = int(num_lsb)
-            decoded_text = self.decode_lsb(stego_video_path, n_lsb)
-            return decoded_text
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-
-    # Function to decode text from video using LSB
-    def decode_lsb(self, video_path, n_lsb):
-        self.frame_extract(video_path)
-
-        temp_folder = "./temp/"
-        # frames = sorted([f for f in os.listdir(temp_folder) if f.endswith('.png')])
-        frames = sorted([f for f in os.listdir(temp_folder) if f.endswith('.png')], key=lambda f: int(f.split('.')[0]))
-
-        text_bits = ''
-
-        for frame_file in frames:
-            frame = cv2.imread(os.path.join(temp_folder, frame_file))
-            print("Decoding frame {}...".format(frame_file))
-            for i in range(frame.shape[0]):
-                for j in range(frame.shape[1]):
-                    for k in range(3):  # Iterate over the BGR channels
-                        bits = format(frame[i, j, k] & ((1 << n_lsb) - 1), f'0{n_lsb}b')
-                        text_bits += bits
-                        if text_bits.endswith('00000000' * 8):
-                            if os.path.exists("./temp"):
-                                try:
-                                    shutil.rmtree("./temp", onerror=self.remove_readonly)
-                                except OSError as e:
-                                    print("Error: %s : %s" % ("./temp", e.strerror))
-                            decoded_text = ''.join([chr(int(text_bits[i:i + 8], 2)) for i in range(0, len(text_bits) - 64, 8)])
-                            with open("decoded_text.txt", "w") as file:
-                                file.write(decoded_text)
-
-                            print("Decoding completed!")
-                            return "Check decoded_text.txt for the decoded text."
-                            # return ''.join([chr(int(text_bits[i:i+8], 2)) for i in range(0, len(text_bits) - 64, 8)])
-
-        if os.path.exists("./temp"):
-            try:
-                shutil.rmtree("./temp", onerror=self.remove_readonly)
-            except OSError as e:
-                print("Error: %s : %s" % ("./temp", e.strerror))
-
-        return 'No message in video detected'
-
-    def encode_audio(self, cover_audio_path, payload_text, num_lsb):
-        if cover_audio_path.endswith('.wav'):
-            with wave.open(cover_audio_path, 'rb') as audio:
-                params = audio.getparams()  # Get audio parameters
-                frames = bytearray(list(audio.readframes(audio.getnframes())))  # Read audio frames
-        
-        binary_payload = ''.join(format(ord(char), '08b') for char in payload_text) + '1111111111111111'  # Convert the payload text to binary and add an end delimiter
-        binary_index = 0
-
-        for i in range(len(frames)):
-            if binary_index < len(binary_payload):
-                frames[i] = frames[i] & ~(1 << (num_lsb - 1)) | (int(binary_payload[binary_index]) << (num_lsb - 1))  # Modify the LSB
-                binary_index += 1
-            else:
-                break
-
-        #stego_audio_path = cover_audio_path.rsplit('.', 1)[0] + '_stego' + cover_audio_path.rsplit('.', 1)[1]  # Create the path for the stego audio
-        stego_audio_path = cover_audio_path.rsplit('.', 1)[0] + '_stego.' + cover_audio_path.rsplit('.', 1)[1]  # Create the path for the stego audio
-        if cover_audio_path.endswith('.wav'):
-            with wave.open(stego_audio_path, 'wb') as audio:
-                audio.setparams(params)  # Set audio parameters
-                audio.writeframes(frames)  # Write the modified frames to the stego audio
-        return stego_audio_path
-
-    def decode_audio(self, stego_audio_path, num_lsb):
-        with wave.open(stego_audio_path, 'rb') as audio:
-            frames = bytearray(list(audio.readframes(audio.getnframes())))
-
-        binary_payload = ''
-        for frame in frames:
-            binary_payload += str((frame >> (num_lsb - 1)) & 1)
-
-        # Assume the delimiter "1111111111111111" was added during encoding
-        end_delimiter = '1111111111111111'
-        if end_delimiter in binary_payload:
-            binary_payload = binary_payload[:binary_payload.index(end_delimiter)]
-
-        byte_payload = [binary_payload[i:i + 8] for i in range(0, len(binary_payload), 8)]
-        decoded_text = ''.join(chr(int(byte, 2)) for byte in byte_payload)
-
-        with open("decodedaudio_text.txt", "w", encoding='utf-8') as file:
-            file.write(decoded_text)
-
-        print("Decoding completed!")
-        return "Check decodedaudio_text.txt for the decoded text."
-
-        #return decoded_text.split(chr(255) * 2)[0]  Find the end delimiter and return the payload
+        return f"Check {output_path} for the decoded text."
+
+    def decode_image(self, stego_image_path, num_lsb, key=None, tag=""):
+        decoded_data = plugins.create_plugin("image", key=key).decode(stego_image_path, num_lsb)
+        return self.complete_decoding(decoded_data, self.decoded_output_path(stego_image_path, tag))
+
+    def encode_video(self, cover_video_path, payload, num_lsb, codec="none", video_codec="png", tag=""):
+        plugin = plugins.create_plugin("video", codec=codec, video_codec=video_codec, stego_suffix="_stego" + tag,
+                                       temp_folder=f"./temp{tag}/")
+        return plugin.encode(cover_video_path, payload, int(num_lsb))
+
+    def decode_video(self, stego_video_path, num_lsb, tag=""):
+        plugin = plugins.create_plugin("video", temp_folder=f"./temp{tag}/")
+        decoded_text = plugin.decode(stego_video_path, int(num_lsb))
+        if decoded_text is None:
+            return 'No message in video detected'
+        return self.complete_decoding(decoded_text, self.decoded_output_path(stego_video_path, tag))
+
+    def encode_audio(self, cover_audio_path, payload, num_lsb, codec="none", key=None, tag=""):
+        plugin = plugins.create_plugin("audio", codec=codec, key=key, stego_suffix="_stego" + tag)
+        return plugin.encode(cover_audio_path, payload, num_lsb)
+
+    def decode_audio(self, stego_audio_path, num_lsb, key=None, tag=""):
+        decoded_text = plugins.create_plugin("audio", key=key).decode(stego_audio_path, num_lsb)
+        return self.complete_decoding(decoded_text, self.decoded_output_path(stego_audio_path, tag))
+
+    def start_job(self, action, target, args, on_done):
+        """Run target(cover_path, *args, tag) on a worker thread, with its own progress row and Cancel button."""
+        cover_path = self.cover_path
+        self.job_count += 1
+        # Jobs started while others run get numbered outputs and temp folders, so they never share one
+        # (a.png and a.jpg both encode to a_stego.png, and every video job extracts frames to ./temp)
+        tag = f"_{self.job_count}" if self.jobs else ""
+        row = tk.Frame(self.jobs_frame)
+        row.pack(fill="x", pady=2)
+        label = tk.Label(row, text=f"{action} {os.path.basename(cover_path)}...", width=60, anchor="w")
+        label.pack(side="left")
+        bar = ttk.Progressbar(row, length=300, mode="indeterminate")
+        bar.pack(side="left", padx=10)
+        bar.start(20)  # Keep moving until a stage reports how far along it is
+        job = background_jobs.Job(target, (cover_path, *args, tag), on_progress=self.job_progress,
+                                  on_done=on_done, on_error=self.job_failed)
+        tk.Button(row, text="Cancel", command=job.cancel).pack(side="left")
+        self.jobs[job] = (cover_path, action, row, label, bar)
+        job.start(self.root)
+
+    def job_progress(self, job, stage, count, total):
+        cover_path, action, _, label, bar = self.jobs[job]
+        cover_name = os.path.basename(cover_path)
+        if total:
+            if bar["mode"] != "determinate":
+                bar.stop()
+                bar.config(mode="determinate", maximum=total)
+            bar.config(value=min(count, total))
+            label.config(text=f"{action} {cover_name}: {stage} {min(count, total)}/{total}")
+        else:
+            label.config(text=f"{action} {cover_name}: {stage}")
+
+    def finish_job(self, job):
+        """Remove a finished job's progress row."""
+        _, _, row, _, bar = self.jobs.pop(job)
+        bar.stop()
+        row.destroy()
+
+    def job_failed(self, job, error):
+        self.finish_job(job)
+        if isinstance(error, background_jobs.JobCancelled):
+            messagebox.showinfo("Cancelled", "The job was cancelled")
+        elif isinstance(error, ValueError):
+            messagebox.showwarning("Error", str(error))
+        else:
+            messagebox.showerror("Error", str(error))
+
+    def image_encoded(self, job, stego_image_path):
+        self.finish_job(job)
+        stego_image = self.previews.get(stego_image_path)  # Usually cached by the encoding job
+        self.stego_image = ImageTk.PhotoImage(stego_image)  # Convert the stego image to PhotoImage
+        self.stego_label.config(image=self.stego_image)  # Display the stego image in the label
+        messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_image_path}")  # Show a success message
+
+    def video_encoded(self, job, stego_video_path):
+        self.finish_job(job)
+        # Reuse the shared VLC instance
+        instance2 = self.vlc_instance()
+        # Create a VLC player
+        self.player2 = instance2.media_player_new()
+        # Create a new Media instance
+        media2 = instance2.media_new(stego_video_path)
+        # Set the player media
+        self.player2.set_media(media2)
+        self.stego_label.config(height=70, width=70)
+        # Set the player window ID
+        self.player2.set_hwnd(self.stego_label.winfo_id())
+        # Play the video
+        self.player2.play()
+        messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_video_path}")
+
+    def audio_encoded(self, job, stego_audio_path):
+        self.finish_job(job)
+        messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_audio_path}")  # Show a success message
+        # Create Play button for stego audio
+        self.stego_play_path = stego_audio_path
+        self.play_button_stego = tk.Button(self.frame, text="Play Stego Audio", command=self.play_stego_audio)
+        self.play_button_stego.grid(row=5, column=1)  # Adjust row and column as per your layout
+
+    def decoded(self, job, decoded_text):
+        self.finish_job(job)
+        messagebox.showinfo("Decoding", f"Decoded text: {decoded_text}")  # Show the decoded text
+
+    def check_then(self, target):
+        """Wrap an encode target so the capacity check runs on the job's worker thread first.
+
+        Sizing a GIF decodes all its frames and sizing a video runs ffprobe, so it stays off the Tk thread.
+        """
+        def encode(cover_path, payload, num_lsb, *args):
+            capacity_planner.check_fits(cover_path, len(payload), num_lsb)
+            return target(cover_path, payload, num_lsb, *args)
+        return encode
+
+    def key(self):
+        """Return the scattering key typed in, or None to fill the cover in order."""
+        return self.key_var.get() or None
 
     def encode(self):
         # Check if both cover and payload files are selected
         if hasattr(self, 'cover_path') and hasattr(self, 'payload_path'):
-            with open(self.payload_path, 'r') as file:
-                payload_text = file.read()  # Read the payload text
+            with open(self.payload_path, 'rb') as file:
+                payload = file.read()  # Read the payload bytes as they are
+            codec = self.codec_var.get()
+            # Uncompressed payloads are checked against the cover's capacity before any of it is embedded
+            checked = self.check_then if codec == "none" else lambda target: target
+            # The encoding runs in the background; the finished stego file is shown by the on_done callback
+            args = (payload, self.lsb_var.get(), codec)
             if self.cover_path.endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
-                stego_image_path = self.encode_image(self.cover_path, payload_text, self.lsb_var.get())  # Encode the payload into the image
-                stego_image = Image.open(stego_image_path)  # Open the stego image
-                stego_image.thumbnail((500, 500))  # Resize the stego image
-                self.stego_image = ImageTk.PhotoImage(stego_image)  # Convert the stego image to PhotoImage
-                self.stego_label.config(image=self.stego_image)  # Display the stego image in the label
-                messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_image_path}")  # Show a success message
-
+                self.start_job("Encoding", checked(self.encode_image), args + (self.key(),), self.image_encoded)  # Encode the payload into the image
             elif self.cover_path.endswith(('.mp4', '.mkv')):
-                stego_video_path = self.encode_video(self.cover_path, payload_text, self.lsb_var.get())  # Encode the payload into the video
-                # Create a VLC instance
-                instance2 = vlc.Instance()
-                # Create a VLC player
-                self.player2 = instance2.media_player_new()
-                # Create a new Media instance
-                media2 = instance2.media_new(stego_video_path)
-                # Set the player media
-                self.player2.set_media(media2)
-                self.stego_label.config(height=70, width=70)
-                # Set the player window ID
-                self.player2.set_hwnd(self.stego_label.winfo_id())
-                # Play the video
-                self.player2.play()
-                messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_video_path}")
-
+                self.start_job("Encoding", checked(self.encode_video), args + (self.video_codec_var.get(),), self.video_encoded)  # Encode the payload into the video
             elif self.cover_path.endswith('.wav'):
-                stego_audio_path = self.encode_audio(self.cover_path, payload_text, self.lsb_var.get())  # Encode the payload into the audio
-                messagebox.showinfo("Encoding", f"Encoding completed successfully: {stego_audio_path}")  # Show a success message
-                # Create Play button for stego audio
-                self.stego_play_path = stego_audio_path
-                self.play_button_stego = tk.Button(self.frame, text="Play Stego Audio", command=self.play_stego_audio)
-                self.play_button_stego.grid(row=5, column=1)  # Adjust row and column as per your layout
+                self.start_job("Encoding", checked(self.encode_audio), args + (self.key(),), self.audio_encoded)  # Encode the payload into the audio
             else:
                 messagebox.showwarning("Error", "Cover file type not supported for encoding")  # Show an error message for unsupported file types
         else:
@@ -466,29 +344,41 @@ class SteganographyApp:
     def decode(self):
         # Check if the cover file is selected
         if hasattr(self, 'cover_path'):
+            args = (self.lsb_var.get(),)
             if self.cover_path.endswith(('.bmp', '.png', '.gif', '.jpg', '.jpeg')):
-                decoded_text = self.decode_image(self.cover_path, self.lsb_var.get())  # Decode the payload from the image
-                messagebox.showinfo("Decoding", f"Decoded text: {decoded_text}")  # Show the decoded text
+                self.start_job("Decoding", self.decode_image, args + (self.key(),), self.decoded)  # Decode the payload from the image
             elif self.cover_path.endswith(('.mp4', '.mkv')):
-                decoded_text = self.decode_video(self.cover_path, self.lsb_var.get())  # Decode the payload from the image
-                messagebox.showinfo("Decoding", f"Decoded text: {decoded_text}")  # Show the decoded text
+                self.start_job("Decoding", self.decode_video, args, self.decoded)  # Decode the payload from the video
             elif self.cover_path.endswith('.wav'):
-                decoded_text = self.decode_audio(self.cover_path, self.lsb_var.get())  # Decode the payload from the audio
-                messagebox.showinfo("Decoding", f"Decoded text: {decoded_text}")  # Show the decoded text
+                self.start_job("Decoding", self.decode_audio, args + (self.key(),), self.decoded)  # Decode the payload from the audio
             else:
                 messagebox.showwarning("Error", "Cover file type not supported for decoding")  # Show an error message for unsupported file types
         else:
             messagebox.showwarning("Error", "Please select a cover file")  # Show an error message if the cover file is not selected
 
-    def play_cover_audio(self):
-        pygame.mixer.music.load(self.cover_path)
+    def vlc_instance(self):
+        """Return the VLC instance shared by the cover and stego players, creating it once."""
+        if self.vlc is None:
+            import vlc  # Only loaded once a video is shown
+            self.vlc = vlc.Instance()
+        return self.vlc
+
+    def play_audio(self, path):
+        import pygame  # Only loaded once audio is played
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()  # Initialize the mixer module
+        pygame.mixer.music.load(path)
         pygame.mixer.music.play()
 
+    def play_cover_audio(self):
+        self.play_audio(self.cover_path)
+
     def play_stego_audio(self):
-        pygame.mixer.music.load(self.stego_play_path)
-        pygame.mixer.music.play()
+        self.play_audio(self.stego_play_path)
 
 if __name__ == "__main__":
+    instrumentation.add_sink(instrumentation.print_sink)  # Report each encode/decode stage on the console
+    from tkinterdnd2 import TkinterDnD
     root = TkinterDnD.Tk()  # Create the main window
     app = SteganographyApp(root)  # Create an instance of the SteganographyApp class
     root.mainloop()  # Run the main loop
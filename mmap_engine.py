@@ -0,0 +1,179 @@
+"""Memory-mapped LSB embedding for uncompressed BMP and WAV covers.
+
+The file header is parsed by hand to find the pixel or sample region, which is then opened with
+np.memmap. Only the pixels or samples that carry the header and payload are read and modified,
+so only their pages are written back. By default the cover is first copied to the stego path
+(a kernel-side copy, or a reflink on copy-on-write filesystems); with in_place=True the cover
+itself is modified and a small payload in a huge cover costs I/O proportional to the payload.
+"""
+import os
+import shutil
+import struct
+from collections import namedtuple
+
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import payload_codec
+import stego_header
+import wav_engine
+
+BmpInfo = namedtuple("BmpInfo", ["offset", "width", "height", "channels", "stride", "top_down"])
+WavInfo = namedtuple("WavInfo", ["offset", "size", "sampwidth", "nchannels"])
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_bmp(path):
+    """Read the pixel layout of an uncompressed 24 or 32-bit BMP, or None if it can't be mapped."""
+    with open(path, 'rb') as file:
+        header = file.read(54)
+    if len(header) < 54 or header[:2] != b'BM':
+        return None
+    offset, = struct.unpack_from('<I', header, 10)
+    width, height, _, bits, compression = struct.unpack_from('<iiHHI', header, 18)
+    if bits not in (24, 32) or compression not in (0, 3) or width <= 0 or height == 0:
+        return None  # Palette and compressed bitmaps need decoding
+    stride = (width * bits + 31) // 32 * 4  # Rows are padded to 4 bytes
+    return BmpInfo(offset, width, abs(height), bits // 8, stride, height < 0)
+
+
+def bmp_pixels(memmap, info):
+    """Return an (height, width, 3) BGR view of a mapped BMP in cv2's top-down row order."""
+    rows = memmap[info.offset:info.offset + info.stride * info.height].reshape(info.height, info.stride)
+    pixels = rows[:, :info.width * info.channels].reshape(info.height, info.width, info.channels)[:, :, :3]
+    return pixels if info.top_down else pixels[::-1]  # Bottom-up bitmaps store the last row first
+
+
+def parse_wav(path):
+    """Find the PCM data chunk of a WAV file, or None if it can't be mapped."""
+    with open(path, 'rb') as file:
+        riff = file.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            chunk = file.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack('<4sI', chunk)
+            if chunk_id == b'fmt ':
+                fmt = file.read(size)
+                file.seek(size % 2, 1)  # Chunks are padded to an even size
+            elif chunk_id == b'data':
+                if fmt is None:
+                    return None
+                format_tag, nchannels, _, _, _, bits = struct.unpack_from('<HHIIHH', fmt)
+                if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE):
+                    return None
+                offset = file.tell()
+                size = min(size, os.path.getsize(path) - offset)  # Streamed WAVs may overstate the size
+                return WavInfo(offset, size, (bits + 7) // 8, nchannels)
+            else:
+                file.seek(size + size % 2, 1)
+
+
+def map_cover(cover_path, stego_path, in_place):
+    """Open the file to modify as a writable memmap, copying the cover first unless in_place."""
+    if not in_place:
+        shutil.copyfile(cover_path, stego_path)
+    return np.memmap(cover_path if in_place else stego_path, dtype=np.uint8, mode='r+')
+
+
+def used_elements(payload_length, num_lsb):
+    """Return how many cover values hold the header and a payload of payload_length bytes."""
+    return stego_header.HEADER_BITS + -(-payload_length * 8 // num_lsb)
+
+
+def encode_bmp(cover_path, stego_path, payload, num_lsb, in_place=False, codec=payload_codec.CODEC_NONE):
+    """Hide payload bytes in a BMP by rewriting only the rows that carry them."""
+    with instrumentation.stage("image", "encode", "bit_prep") as stage:
+        payload = payload_codec.pack_payload(payload, codec)
+        stage.add(bytes=len(payload))
+    info = parse_bmp(cover_path)
+    if info is None:
+        raise ValueError("Only uncompressed 24 or 32-bit BMP files can be memory mapped.")
+    row_elements = info.width * 3
+    if len(payload) > lsb_engine.payload_capacity(row_elements * info.height, num_lsb):
+        raise ValueError("Insufficient bytes, need bigger image, smaller payload or more LSB.")
+    with instrumentation.stage("image", "encode", "cover_read", path=cover_path):
+        memmap = map_cover(cover_path, stego_path, in_place)
+    pixels = bmp_pixels(memmap, info)
+    rows = -(-used_elements(len(payload), num_lsb) // row_elements)
+    with instrumentation.stage("image", "encode", "embed") as stage:
+        block = np.array(pixels[:rows])  # Contiguous copy of just the rows that change, in cv2 order
+        stage.add(bytes=len(payload), count=lsb_engine.embed_payload(block.reshape(-1), payload, num_lsb, stego_header.MODALITY_IMAGE))
+        pixels[:rows] = block
+    with instrumentation.stage("image", "encode", "write") as stage:
+        memmap.flush()
+        stage.add(bytes=block.nbytes)
+    del memmap
+    return cover_path if in_place else stego_path
+
+
+def decode_bmp(stego_path, num_lsb):
+    """Return the payload bytes hidden in a BMP, reading only the rows that carry them."""
+    info = parse_bmp(stego_path)
+    if info is None:
+        raise ValueError("Only uncompressed 24 or 32-bit BMP files can be memory mapped.")
+    pixels = bmp_pixels(np.memmap(stego_path, dtype=np.uint8, mode='r'), info)
+    row_elements = info.width * 3
+    header_rows = -(-stego_header.HEADER_BITS // row_elements)
+    with instrumentation.stage("image", "decode", "extract", path=stego_path) as stage:
+        header = lsb_engine.read_header(np.array(pixels[:header_rows]).reshape(-1))
+        if header is None:
+            # Legacy sentinel format: fall back to scanning the whole pixel array
+            return lsb_engine.find_legacy_payload(np.array(pixels).reshape(-1), num_lsb, lsb_engine.IMAGE_STOP_MARKER)
+        rows = -(-used_elements(header.length, header.num_lsb) // row_elements)
+        stored = lsb_engine.extract_payload(np.array(pixels[:rows]).reshape(-1), header)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("image", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
+
+
+def wav_samples(memmap, info):
+    """Return a view of the low byte of every sample in a mapped WAV data chunk."""
+    data = memmap[info.offset:info.offset + info.size]
+    return wav_engine.sample_lsb_view(data, info.sampwidth)
+
+
+def encode_wav(cover_path, stego_path, payload, num_lsb, in_place=False, codec=payload_codec.CODEC_NONE):
+    """Hide payload bytes in a WAV by rewriting only the samples that carry them."""
+    with instrumentation.stage("audio", "encode", "bit_prep") as stage:
+        payload = payload_codec.pack_payload(payload, codec)
+        plan = lsb_engine.payload_plan(payload, num_lsb, stego_header.MODALITY_AUDIO)
+        stage.add(bytes=len(payload))
+    info = parse_wav(cover_path)
+    if info is None:
+        raise ValueError("Only PCM WAV files can be memory mapped.")
+    if len(payload) > lsb_engine.payload_capacity(info.size // info.sampwidth, num_lsb):
+        raise ValueError("Insufficient bytes, need longer audio, smaller payload or more LSB.")
+    with instrumentation.stage("audio", "encode", "cover_read", path=cover_path):
+        memmap = map_cover(cover_path, stego_path, in_place)
+    samples = wav_samples(memmap, info)[:used_elements(len(payload), num_lsb)]
+    with instrumentation.stage("audio", "encode", "embed") as stage:
+        lsb_engine.apply_plan(samples, 0, plan)
+        stage.add(bytes=len(payload), count=len(samples))
+    with instrumentation.stage("audio", "encode", "write"):
+        memmap.flush()
+    del memmap
+    return cover_path if in_place else stego_path
+
+
+def decode_wav(stego_path, num_lsb):
+    """Return the payload bytes hidden in a WAV, reading only the samples that carry them."""
+    info = parse_wav(stego_path)
+    if info is None:
+        raise ValueError("Only PCM WAV files can be memory mapped.")
+    memmap = np.memmap(stego_path, dtype=np.uint8, mode='r')
+    samples = wav_samples(memmap, info)
+    with instrumentation.stage("audio", "decode", "extract", path=stego_path) as stage:
+        header = lsb_engine.read_header(samples)
+        if header is None:
+            return wav_engine.decode_legacy(memmap[info.offset:info.offset + info.size], num_lsb)
+        stored = lsb_engine.extract_payload(samples, header)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("audio", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
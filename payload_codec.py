@@ -0,0 +1,77 @@
+"""Payload layer: arbitrary bytes with optional compression.
+
+From header version 2 on, the stored payload starts with one byte naming the codec used for
+the rest of it, so the decoder can reverse it whatever the encoder was configured with.
+Payloads that don't get smaller are stored as they are.
+"""
+import lzma
+import zlib
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA}
+PACKED_OVERHEAD = 1  # The codec byte in front of every stored payload
+
+
+def to_bytes(payload):
+    """Return payload as bytes; text is encoded as UTF-8."""
+    if isinstance(payload, str):
+        return payload.encode('utf-8')
+    return bytes(payload)
+
+
+def codec_id(codec):
+    """Turn a codec name ('none', 'zlib', 'lzma') or code into its code."""
+    if isinstance(codec, str):
+        if codec.lower() not in CODECS:
+            raise ValueError(f"Unknown payload codec {codec!r}, choose from {', '.join(CODECS)}.")
+        return CODECS[codec.lower()]
+    if codec not in CODECS.values():
+        raise ValueError(f"Unknown payload codec {codec!r}.")
+    return codec
+
+
+def compress(data, codec):
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 9)
+    if codec == CODEC_LZMA:
+        return lzma.compress(data, format=lzma.FORMAT_XZ, preset=9)
+    return data
+
+
+def decompress(data, codec):
+    try:
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(data)
+        if codec == CODEC_LZMA:
+            return lzma.decompress(data)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"Corrupt compressed payload: {e}") from None
+    if codec != CODEC_NONE:
+        raise ValueError(f"Unknown payload codec {codec!r}.")
+    return data
+
+
+def pack_payload(payload, codec=CODEC_NONE):
+    """Return the bytes stored in the cover: a codec byte followed by the (compressed) payload."""
+    data = to_bytes(payload)
+    codec = codec_id(codec)
+    packed = compress(data, codec)
+    if len(packed) >= len(data):
+        codec, packed = CODEC_NONE, data  # Compression didn't help, so don't make the decoder undo it
+    return bytes([codec]) + packed
+
+
+def usable_capacity(stored_capacity):
+    """Return how many uncompressed payload bytes fit in stored_capacity bytes of cover."""
+    return max(stored_capacity - PACKED_OVERHEAD, 0)
+
+
+def unpack_payload(stored, header):
+    """Reverse pack_payload for the stored bytes read behind header."""
+    if header.version < 2:
+        return stored  # Version 1 headers were followed by the raw payload
+    if not stored:
+        raise ValueError("Stored payload is missing its codec byte.")
+    return decompress(stored[1:], stored[0])
@@ -0,0 +1,198 @@
+"""Split a payload too large for one cover into shards embedded across several covers in parallel.
+
+Each cover gets a share of the payload in proportion to its capacity, so every cover carries some
+of it and the shards embed side by side on a process pool. A shard starts with a header holding
+an id for the whole payload, its sequence number, the shard count and a CRC-32 of its data, so
+the decoder can extract the covers in any order, check each shard and put them back in sequence.
+
+Examples:
+    python payload_shards.py encode --payload archive.zip --lsb 2 covers/
+    python payload_shards.py decode covers/*_stego.* --lsb 2 --output archive.zip
+"""
+import argparse
+import hashlib
+import os
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import capacity_planner
+import plugins
+import stego_batch
+import stego_header
+
+
+def payload_id(payload):
+    """Return the id shared by every shard of payload, also used to check the reassembled payload."""
+    return hashlib.sha256(payload).digest()[:8]
+
+
+def shard_sizes(length, capacities):
+    """Split length bytes across covers in proportion to their capacities (after the shard header).
+
+    Raises ValueError if the covers can't hold the payload between them.
+    """
+    usable = [max(capacity - stego_header.SHARD_SIZE, 0) for capacity in capacities]
+    total = sum(usable)
+    if length > total:
+        raise ValueError(f"Payload of {length} bytes exceeds the {total} bytes the covers hold between them.")
+    sizes = [length * capacity // total if total else 0 for capacity in usable]
+    for index in sorted(range(len(usable)), key=lambda i: usable[i] - sizes[i], reverse=True):
+        if sum(sizes) == length:
+            break
+        sizes[index] += 1  # Hand out the rounding remainder to covers with room to spare
+    return sizes
+
+
+def split_payload(payload, capacities):
+    """Return [(cover index, shard bytes)] for the covers that get part of payload."""
+    sizes = shard_sizes(len(payload), capacities)
+    used = [index for index, size in enumerate(sizes) if size] or [0]  # An empty payload still needs one shard
+    identifier = payload_id(payload)
+    shards = []
+    start = 0
+    for sequence, index in enumerate(used):
+        data = payload[start:start + sizes[index]]
+        start += sizes[index]
+        header = stego_header.pack_shard_header(identifier, sequence, len(used), zlib.crc32(data))
+        shards.append((index, header + data))
+    return shards
+
+
+def join_shards(shards):
+    """Reassemble the payload from (path, ShardHeader, data) tuples given in any order.
+
+    Raises ValueError if the shards belong to different payloads, any are missing or the
+    reassembled payload doesn't match its id.
+    """
+    ids = {header.payload_id for _, header, _ in shards}
+    if len(ids) != 1:
+        raise ValueError(f"Stego files hold shards of {len(ids)} different payloads")
+    total = shards[0][1].total
+    by_sequence = {header.sequence: data for _, header, data in shards}
+    missing = [str(sequence + 1) for sequence in range(total) if sequence not in by_sequence]
+    if missing:
+        raise ValueError(f"Missing shard {', '.join(missing)} of {total}")
+    payload = b"".join(by_sequence[sequence] for sequence in range(total))
+    if payload_id(payload) != ids.pop():
+        raise ValueError("Reassembled payload does not match its checksum")
+    return payload
+
+
+def encode_shard(cover_path, shard, num_lsb, method="lsb", options=None):
+    """Embed one shard in a worker process and return the stego file path."""
+    plugin = plugins.create_plugin(plugins.plugin_name_for_path(cover_path, method))
+    if plugin.name == "video":
+        plugin.temp_folder = f"./temp-{os.getpid()}/"  # Keep concurrent video jobs apart
+    stego_batch.configure_plugin(plugin, options)
+    return plugin.encode(cover_path, shard, num_lsb)
+
+
+def decode_shard(stego_path, num_lsb, method="lsb", options=None):
+    """Extract one shard in a worker process and return (path, ShardHeader, data), or None if there is none."""
+    plugin = plugins.create_plugin(plugins.plugin_name_for_path(stego_path, method))
+    if plugin.name == "video":
+        plugin.temp_folder = f"./temp-{os.getpid()}/"
+    stego_batch.configure_plugin(plugin, options)
+    shard = plugin.decode(stego_path, num_lsb)
+    header = stego_header.unpack_shard_header(shard or b"")
+    if header is None:
+        return None  # A cover, or a stego file holding a whole payload
+    data = bytes(shard[stego_header.SHARD_SIZE:])
+    if zlib.crc32(data) != header.checksum:
+        raise ValueError(f"Shard {header.sequence + 1} of {header.total} in {os.path.basename(stego_path)} is corrupt")
+    return stego_path, header, data
+
+
+def check_distinct_outputs(cover_paths, method):
+    """Raise ValueError if two covers would be embedded into the same stego file.
+
+    Plugins name the stego file after the cover without its extension, so a cover given twice, or
+    covers such as a.png and a.jpg in one folder, would overwrite each other's shard.
+    """
+    seen = {}
+    for cover_path in cover_paths:
+        stem = os.path.splitext(os.path.normcase(os.path.abspath(cover_path)))[0]
+        output = (plugins.plugin_name_for_path(cover_path, method), stem)
+        if output in seen:
+            raise ValueError(f"{cover_path} and {seen[output]} would be written to the same stego file")
+        seen[output] = cover_path
+
+
+def encode_sharded(cover_paths, payload, num_lsb, method="lsb", workers=None, options=None):
+    """Split payload across cover_paths, embed the shards in parallel and return the stego file paths in sequence."""
+    for cover_path in cover_paths:
+        if plugins.plugin_name_for_path(cover_path, method) is None:
+            raise ValueError(f"Cover file type not supported: {os.path.basename(cover_path)}")
+    check_distinct_outputs(cover_paths, method)
+    # Capacities come from header and metadata reads only, so nothing is embedded unless it all fits
+    capacities = [capacity_planner.cover_capacity(cover_path, num_lsb, method) for cover_path in cover_paths]
+    shards = split_payload(payload, capacities)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(encode_shard, cover_paths[index], shard, num_lsb, method, options) for index, shard in shards]
+        return [future.result() for future in futures]
+
+
+def decode_sharded(stego_paths, num_lsb, method="lsb", workers=None, options=None):
+    """Extract the shards from stego_paths, given in any order, in parallel and return the payload.
+
+    Files without a shard are skipped, so a folder holding the covers as well can be given.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(decode_shard, stego_path, num_lsb, method, options) for stego_path in stego_paths]
+        shards = [shard for shard in (future.result() for future in futures) if shard is not None]
+    if not shards:
+        raise ValueError("No payload shards found")
+    return join_shards(shards)
+
+
+def expand_paths(paths, method, skip_stego=False):
+    """Replace any folders in paths with the files in them that a plugin handles."""
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            expanded.extend(stego_batch.find_covers(path, method, skip_stego))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split a payload across several covers, or join it back.")
+    parser.add_argument("action", choices=["encode", "decode"])
+    parser.add_argument("paths", nargs="+", help="Cover (or stego) files or folders")
+    parser.add_argument("--payload", help="Payload file to split across the covers when encoding")
+    parser.add_argument("--output", help="File the reassembled payload is written to when decoding")
+    parser.add_argument("--lsb", type=int, default=1, choices=range(1, 9), help="Number of LSBs (default 1)")
+    parser.add_argument("--method", choices=["lsb", "bpcs"], default="lsb")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--compress", choices=["none", "zlib", "lzma"], default="none",
+                        help="Compress each shard before embedding when it makes it smaller (default none)")
+    args = parser.parse_args(argv)
+    if args.action == "encode" and not args.payload:
+        parser.error("--payload is required when encoding")
+    if args.action == "decode" and not args.output:
+        parser.error("--output is required when decoding")
+
+    paths = expand_paths(args.paths, args.method, skip_stego=args.action == "encode")
+    options = {"codec": args.compress}
+    try:
+        if args.action == "encode":
+            with open(args.payload, 'rb') as file:
+                payload = file.read()
+            outputs = encode_sharded(paths, payload, args.lsb, args.method, args.workers, options)
+            for sequence, output in enumerate(outputs, 1):
+                print(f"[{sequence}/{len(outputs)}] {output}")
+        else:
+            payload = decode_sharded(paths, args.lsb, args.method, args.workers, options)
+            with open(args.output, 'wb') as file:
+                file.write(payload)
+            print(f"Joined {len(payload)} bytes into {args.output}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
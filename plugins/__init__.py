@@ -0,0 +1,95 @@
+"""Registry of modality plugins that encode and decode payloads for each kind of cover file.
+
+Plugin modules are only imported the first time a file of their type is handled, and each plugin
+imports its heavy dependency (cv2, moviepy, ...) inside the methods that need it, so a process
+that only touches images never loads the video or audio stacks.
+"""
+import importlib
+import os
+
+_REGISTRY = {}  # name -> (module name, class name, extensions, method)
+_INSTANCES = {}  # name -> plugin instance, created on first use
+
+
+class ModalityPlugin:
+    """Base class for a modality plugin."""
+    name = None
+    extensions = ()
+    stego_suffix = '_stego'  # Appended to the cover's name to name the stego file
+
+    def encode(self, cover_path, payload, num_lsb):
+        """Hide payload bytes (or text, stored as UTF-8) in the cover file and return the stego file path."""
+        raise NotImplementedError
+
+    def decode(self, stego_path, num_lsb):
+        """Return the payload bytes hidden in the stego file, or None if there is none."""
+        raise NotImplementedError
+
+    def capacity(self, cover_path, num_lsb):
+        """Return how many uncompressed payload bytes fit in the cover, reading only its header."""
+        raise NotImplementedError
+
+    def stego_path(self, cover_path, extension):
+        """Return the output path used for the stego version of cover_path."""
+        return os.path.splitext(cover_path)[0] + self.stego_suffix + extension
+
+
+def register(name, module, class_name, extensions, method="lsb"):
+    """Register a plugin class by import path without importing it."""
+    _REGISTRY[name] = (module, class_name, tuple(extensions), method)
+    _INSTANCES.pop(name, None)
+
+
+def create_plugin(name, **options):
+    """Return a new, unshared instance of the plugin registered under name, with options set on it.
+
+    Jobs that run side by side each take their own instance, so one job's options (codec,
+    stego_suffix, temp_folder, ...) never leak into another's.
+    """
+    if name not in _REGISTRY:
+        raise KeyError(f"No modality plugin registered as {name!r}")
+    module, class_name, _, _ = _REGISTRY[name]
+    plugin = getattr(importlib.import_module(module), class_name)()
+    for option, value in options.items():
+        setattr(plugin, option, value)
+    return plugin
+
+
+def get_plugin(name):
+    """Return the plugin registered under name, importing its module on first use."""
+    if name not in _INSTANCES:
+        _INSTANCES[name] = create_plugin(name)
+    return _INSTANCES[name]
+
+
+def plugin_name_for_path(path, method="lsb"):
+    """Return the name of the plugin that handles path with the given method, or None."""
+    extension = os.path.splitext(path)[1].lower()
+    for name, (_, _, extensions, plugin_method) in _REGISTRY.items():
+        if plugin_method == method and extension in extensions:
+            return name
+    return None
+
+
+def plugin_for_path(path, method="lsb"):
+    """Return the plugin that handles path with the given method."""
+    name = plugin_name_for_path(path, method)
+    if name is None:
+        raise ValueError(f"Cover file type not supported: {os.path.basename(path)}")
+    return get_plugin(name)
+
+
+def supported_extensions(method="lsb"):
+    """Return every file extension handled by plugins of the given method."""
+    return tuple(ext for _, _, extensions, plugin_method in _REGISTRY.values()
+                 if plugin_method == method for ext in extensions)
+
+
+IMAGE_EXTENSIONS = ('.bmp', '.png', '.gif', '.jpg', '.jpeg', '.tif', '.tiff', '.ppm')
+AUDIO_EXTENSIONS = ('.wav',)
+VIDEO_EXTENSIONS = ('.mp4', '.mkv')
+
+register("image", "plugins.image", "ImagePlugin", IMAGE_EXTENSIONS)
+register("audio", "plugins.audio", "AudioPlugin", AUDIO_EXTENSIONS)
+register("video", "plugins.video", "VideoPlugin", VIDEO_EXTENSIONS)
+register("bpcs", "plugins.bpcs", "BpcsPlugin", IMAGE_EXTENSIONS, method="bpcs")
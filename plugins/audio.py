@@ -0,0 +1,56 @@
+import os
+
+import instrumentation
+import lsb_engine
+import mmap_engine
+import payload_codec
+import wav_engine
+from plugins import ModalityPlugin, AUDIO_EXTENSIONS
+
+
+class AudioPlugin(ModalityPlugin):
+    """LSB steganography over the low bits of every PCM sample of a WAV file.
+
+    With mapped=True the sample region is memory mapped and only the samples carrying the payload
+    are rewritten, in a copy of the cover or in the cover itself with in_place=True.
+    Payloads are compressed with codec ('none', 'zlib' or 'lzma') when that makes them smaller.
+    With a key the payload bits are scattered over the samples in a key-seeded order (the whole
+    file is then read and written at once, without memory mapping); decode needs the same key.
+    """
+    name = "audio"
+    extensions = AUDIO_EXTENSIONS
+
+    def __init__(self, mapped=False, in_place=False, codec="none", key=None):
+        self.mapped = mapped
+        self.in_place = in_place
+        self.codec = codec
+        self.key = key
+
+    def can_map(self, path):
+        return self.mapped and self.key is None and mmap_engine.parse_wav(path) is not None
+
+    def capacity(self, cover_path, num_lsb):
+        info = wav_engine.wav_info(cover_path)  # Reads the RIFF chunk headers only
+        samples = info.size // info.sampwidth
+        return payload_codec.usable_capacity(lsb_engine.payload_capacity(samples, num_lsb))
+
+    def encode(self, cover_path, payload, num_lsb):
+        stego_audio_path = self.stego_path(cover_path, os.path.splitext(cover_path)[1])  # Create the path for the stego audio
+        payload = payload_codec.to_bytes(payload)
+        codec = payload_codec.codec_id(self.codec)
+        with instrumentation.stage(self.name, "encode", "total", path=cover_path) as stage:
+            stage.add(bytes=len(payload))
+            if self.can_map(cover_path):
+                stego_audio_path = mmap_engine.encode_wav(cover_path, stego_audio_path, payload, num_lsb, self.in_place, codec)
+            else:
+                wav_engine.encode_wav(cover_path, stego_audio_path, payload, num_lsb, codec=codec, key=self.key)
+        return stego_audio_path
+
+    def decode(self, stego_path, num_lsb):
+        with instrumentation.stage(self.name, "decode", "total", path=stego_path) as stage:
+            if self.can_map(stego_path):
+                decoded_data = mmap_engine.decode_wav(stego_path, num_lsb)
+            else:
+                decoded_data = wav_engine.decode_wav(stego_path, num_lsb, key=self.key)
+            stage.add(bytes=len(decoded_data))
+        return decoded_data
@@ -0,0 +1,147 @@
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import payload_codec
+import stego_header
+from plugins import ModalityPlugin, IMAGE_EXTENSIONS
+
+BPCS_BLOCK_SIZE = 8
+BPCS_THRESHOLD = 30  # Blocks with more bit transitions than this carry payload
+BPCS_MAX_COMPLEXITY = 2 * BPCS_BLOCK_SIZE * (BPCS_BLOCK_SIZE - 1)  # Transitions in a checkerboard block
+BPCS_SAMPLE_ROWS = 64  # Block rows inspected when estimating capacity
+
+# Conjugating a block (XOR with a checkerboard) turns its complexity c into BPCS_MAX_COMPLEXITY - c.
+# Bit [0, 0] of every payload block flags conjugation, so each block carries 63 payload bits.
+CHECKERBOARD = (np.indices((BPCS_BLOCK_SIZE, BPCS_BLOCK_SIZE)).sum(axis=0) % 2).astype(np.uint8)
+BLOCK_PAYLOAD_BITS = BPCS_BLOCK_SIZE * BPCS_BLOCK_SIZE - 1
+
+
+class BpcsPlugin(ModalityPlugin):
+    """Bit-plane complexity segmentation over the grayscale bit planes of an image.
+
+    The bit planes are reshaped into a (rows, columns, 8, 8) block tensor, the complexity of every
+    block is computed in one pass and payload bits are scattered into all complex blocks at once.
+    """
+    name = "bpcs"
+    extensions = IMAGE_EXTENSIONS
+    stego_suffix = '_bpcs_stego'
+
+    def __init__(self, threshold=BPCS_THRESHOLD, codec="none"):
+        # Conjugation only guarantees a payload block stays complex when the threshold is below half
+        # the maximum (less the two transitions the flag bit can add)
+        if not 0 <= threshold < (BPCS_MAX_COMPLEXITY - 2) // 2:
+            raise ValueError(f"BPCS threshold must be between 0 and {(BPCS_MAX_COMPLEXITY - 2) // 2 - 1}.")
+        self.threshold = threshold
+        self.codec = codec
+
+    def calculate_complexity(self, block):
+        # Calculate the complexity of an 8x8 block, or of every block in a (..., 8, 8) tensor
+        return (np.count_nonzero(block[..., :, 1:] != block[..., :, :-1], axis=(-2, -1))
+                + np.count_nonzero(block[..., 1:, :] != block[..., :-1, :], axis=(-2, -1)))
+
+    def read_bit_planes(self, image_path, action):
+        from PIL import Image  # Loaded on first BPCS image only
+        with instrumentation.stage(self.name, action, "cover_read", path=image_path) as stage:
+            image = Image.open(image_path).convert('L')  # Convert image to grayscale
+            image_data = np.array(image)
+            stage.add(bytes=image_data.nbytes)
+            return np.unpackbits(image_data, axis=1)  # Convert to binary
+
+    def block_view(self, binary_image):
+        """Return a (rows, columns, 8, 8) view of the whole blocks of a binary image."""
+        size = BPCS_BLOCK_SIZE
+        rows, columns = binary_image.shape[0] // size, binary_image.shape[1] // size
+        blocks = binary_image[:rows * size, :columns * size].reshape(rows, size, columns, size)
+        return blocks.transpose(0, 2, 1, 3)  # Blocks in the same row-major order as the old loops
+
+    def complex_blocks(self, blocks):
+        """Return the (row, column) indexes of every block above the threshold, in row-major order."""
+        return np.nonzero(self.calculate_complexity(blocks) > self.threshold)
+
+    def blocks_capacity(self, count):
+        """Return how many uncompressed payload bytes fit in count complex blocks."""
+        return payload_codec.usable_capacity(max(count * BLOCK_PAYLOAD_BITS // 8 - stego_header.HEADER_SIZE, 0))
+
+    def capacity(self, cover_path, num_lsb=None, exact=False):
+        """Estimate how many payload bytes fit in an image from a sample of its block rows.
+
+        The complex blocks of up to BPCS_SAMPLE_ROWS evenly spaced block rows are counted and the
+        count is scaled to the whole image; exact=True counts every block instead.
+        """
+        from PIL import Image
+        with Image.open(cover_path) as image:
+            image_data = np.asarray(image.convert('L'))
+        size = BPCS_BLOCK_SIZE
+        rows = image_data.shape[0] // size
+        if exact or rows <= BPCS_SAMPLE_ROWS:
+            sample = np.arange(rows)
+        else:
+            sample = np.linspace(0, rows - 1, BPCS_SAMPLE_ROWS).astype(int)
+        sampled = image_data[:rows * size].reshape(rows, size, -1)[sample].reshape(len(sample) * size, -1)
+        count = len(self.complex_blocks(self.block_view(np.unpackbits(sampled, axis=1)))[0])
+        return self.blocks_capacity(count * rows // len(sample) if len(sample) else 0)
+
+    def encode(self, cover_path, payload, num_lsb=None):
+        from PIL import Image
+        with instrumentation.stage(self.name, "encode", "total", path=cover_path) as total:
+            binary_image = self.read_bit_planes(cover_path, "encode")
+            blocks = self.block_view(binary_image)
+            with instrumentation.stage(self.name, "encode", "complexity") as stage:
+                rows, columns = self.complex_blocks(blocks)
+                stage.add(count=len(rows))
+
+            with instrumentation.stage(self.name, "encode", "bit_prep") as stage:
+                payload = payload_codec.pack_payload(payload, self.codec)
+                header = stego_header.pack_header(stego_header.MODALITY_BPCS, 1, len(payload))
+                payload_bits = np.unpackbits(np.frombuffer(header + payload, dtype=np.uint8))
+                count = -(-len(payload_bits) // BLOCK_PAYLOAD_BITS)
+                if count > len(rows):
+                    raise ValueError("Insufficient complex blocks, need bigger or busier image or smaller payload.")
+
+                # Lay the payload out as whole blocks, flag bit first and zero padding at the end
+                padded = np.zeros(count * BLOCK_PAYLOAD_BITS, dtype=np.uint8)
+                padded[:len(payload_bits)] = payload_bits
+                new_blocks = np.concatenate([np.zeros((count, 1), dtype=np.uint8), padded.reshape(count, -1)], axis=1)
+                new_blocks = new_blocks.reshape(count, BPCS_BLOCK_SIZE, BPCS_BLOCK_SIZE)
+                stage.add(bytes=len(payload), count=count)
+            total.add(bytes=len(payload))
+
+            with instrumentation.stage(self.name, "encode", "embed") as stage:
+                # Conjugate payload blocks that are too simple so the decoder still selects them
+                simple = self.calculate_complexity(new_blocks) <= self.threshold
+                new_blocks[simple] ^= CHECKERBOARD
+                new_blocks[simple, 0, 0] = 1
+
+                blocks[rows[:count], columns[:count]] = new_blocks  # Scatter into all selected blocks at once
+                stage.add(count=count)
+
+            stego_path = self.stego_path(cover_path, '.png')  # Lossless, whatever the cover's format
+            with instrumentation.stage(self.name, "encode", "write", path=stego_path):
+                stego_image_data = np.packbits(binary_image, axis=1)
+                stego_image = Image.fromarray(stego_image_data)
+                stego_image.save(stego_path)
+        return stego_path
+
+    def decode(self, stego_path, num_lsb=None):
+        with instrumentation.stage(self.name, "decode", "total", path=stego_path):
+            blocks = self.block_view(self.read_bit_planes(stego_path, "decode"))
+            with instrumentation.stage(self.name, "decode", "extract") as stage:
+                rows, columns = self.complex_blocks(blocks)
+                header_blocks = -(-stego_header.HEADER_BITS // BLOCK_PAYLOAD_BITS)
+                header = stego_header.unpack_header(self.gather_bytes(blocks, rows[:header_blocks], columns[:header_blocks]))
+                if header is None or header.modality != stego_header.MODALITY_BPCS:
+                    return None
+                count = -(-(stego_header.HEADER_BITS + header.length * 8) // BLOCK_PAYLOAD_BITS)
+                data = self.gather_bytes(blocks, rows[:count], columns[:count])
+                stage.add(bytes=header.length, count=count)
+            with instrumentation.stage(self.name, "decode", "unpack"):
+                return payload_codec.unpack_payload(data[stego_header.HEADER_SIZE:stego_header.HEADER_SIZE + header.length], header)
+
+    def gather_bytes(self, blocks, rows, columns):
+        """Gather the payload bits of the given blocks, undoing conjugation, as bytes."""
+        selected = blocks[rows, columns]  # Fancy indexing copies, so the image is left untouched
+        conjugated = selected[:, 0, 0] == 1
+        selected[conjugated] ^= CHECKERBOARD
+        bits = selected.reshape(len(selected), -1)[:, 1:].reshape(-1)
+        return lsb_engine.bits_to_bytes(bits)
@@ -0,0 +1,122 @@
+import os
+
+import gif_engine
+import instrumentation
+import lsb_engine
+import mmap_engine
+import payload_codec
+import tiled_engine
+from plugins import ModalityPlugin, IMAGE_EXTENSIONS
+
+
+class ImagePlugin(ModalityPlugin):
+    """LSB steganography over every BGR channel of an image, read and written with cv2.
+
+    With mapped=True, uncompressed BMP covers are memory mapped and only the rows carrying the
+    payload are rewritten into a _stego.bmp copy (or the cover itself with in_place=True).
+    With tiled=True, uncompressed BMP, PPM and TIFF covers are processed in strips of strip_rows
+    rows so memory stays bounded however large the image is; other covers use the whole image.
+    Payloads are compressed with codec ('none', 'zlib' or 'lzma') when that makes them smaller.
+    GIF covers go through gif_engine, which embeds into the palette indices of every frame and
+    writes an animated _stego.gif with the original frame timing.
+    With a key the payload bits are scattered over the image in a key-seeded order instead of
+    filling it from the top (the whole image is then processed at once); decode needs the same key.
+    With preview_size set, encode also leaves a thumbnail of the stego image in preview, made from
+    the array in memory (mapped and tiled encodes never hold the whole image, so it stays None).
+    """
+    name = "image"
+    extensions = IMAGE_EXTENSIONS
+
+    def __init__(self, mapped=False, in_place=False, tiled=False, strip_rows=tiled_engine.STRIP_ROWS, codec="none",
+                 preview_size=None, key=None):
+        self.mapped = mapped
+        self.in_place = in_place
+        self.tiled = tiled
+        self.strip_rows = strip_rows
+        self.codec = codec
+        self.preview_size = preview_size
+        self.preview = None  # Thumbnail of the last stego image, see preview_size
+        self.key = key
+
+    def can_map(self, path):
+        return self.mapped and self.key is None and path.lower().endswith('.bmp') and mmap_engine.parse_bmp(path) is not None
+
+    def can_tile(self, path):
+        # Scattered bits can land in any strip, so keyed jobs always use the whole image
+        return self.tiled and self.key is None and tiled_engine.can_tile(path)
+
+    def read(self, path, action):
+        import cv2  # Loaded on first image only
+        with instrumentation.stage(self.name, action, "cover_read", path=path) as stage:
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError(f"Cannot read image file: {path}")
+            stage.add(bytes=image.nbytes)
+        return image
+
+    def write(self, path, image):
+        import cv2
+        with instrumentation.stage(self.name, "encode", "write", path=path) as stage:
+            cv2.imwrite(path, image)
+            stage.add(bytes=image.nbytes)
+
+    def is_gif(self, path):
+        return path.lower().endswith('.gif')
+
+    def capacity(self, cover_path, num_lsb):
+        if self.is_gif(cover_path):
+            # Pixels near the transparent index carry nothing, so the frames have to be read to count the rest
+            return payload_codec.usable_capacity(gif_engine.capacity(cover_path, num_lsb))
+        from PIL import Image  # Opening an image only parses its header
+        with Image.open(cover_path) as image:
+            width, height = image.size
+        # cv2 reads every image as three BGR channels, whatever its mode
+        return payload_codec.usable_capacity(lsb_engine.payload_capacity(width * height * 3, num_lsb))
+
+    def encode(self, cover_path, payload, num_lsb):
+        payload = payload_codec.to_bytes(payload)
+        with instrumentation.stage(self.name, "encode", "total", path=cover_path) as stage:
+            stage.add(bytes=len(payload))
+            return self.encode_bytes(cover_path, payload, num_lsb, payload_codec.codec_id(self.codec))
+
+    def encode_bytes(self, cover_path, payload, num_lsb, codec):
+        if self.is_gif(cover_path):
+            stego_path = self.stego_path(cover_path, '.gif')
+            return gif_engine.encode_gif(cover_path, stego_path, payload, num_lsb, codec, self.key)
+        if self.can_tile(cover_path):
+            extension = os.path.splitext(cover_path)[1]
+            return tiled_engine.encode_tiled(cover_path, self.stego_path(cover_path, extension), payload,
+                                             num_lsb, self.strip_rows, self.in_place, codec)
+        if self.can_map(cover_path):
+            return mmap_engine.encode_bmp(cover_path, self.stego_path(cover_path, '.bmp'), payload, num_lsb,
+                                          self.in_place, codec)
+        image = self.read(cover_path, "encode")
+        # embed the stego header and (compressed) payload across the whole image array at once
+        lsb_engine.encode_image_array(image, payload, num_lsb, codec=codec, key=self.key)
+
+        stego_image_path = self.stego_path(cover_path, '.png')  # Create the path for the stego image
+        self.write(stego_image_path, image)
+        if self.preview_size:
+            import preview_cache
+            self.preview = preview_cache.thumbnail_from_array(image, self.preview_size)
+        return stego_image_path
+
+    def decode(self, stego_path, num_lsb):
+        with instrumentation.stage(self.name, "decode", "total", path=stego_path) as stage:
+            decoded_data = self.decode_bytes(stego_path, num_lsb)
+            stage.add(bytes=len(decoded_data))
+        return decoded_data
+
+    def decode_bytes(self, stego_path, num_lsb):
+        if self.is_gif(stego_path):
+            decoded_data = gif_engine.decode_gif(stego_path, self.key)
+            if decoded_data is None:
+                raise ValueError(f"No message found in {stego_path}")
+            return decoded_data
+        if self.can_tile(stego_path):
+            return tiled_engine.decode_tiled(stego_path, num_lsb, self.strip_rows)
+        if self.can_map(stego_path):
+            return mmap_engine.decode_bmp(stego_path, num_lsb)
+        image = self.read(stego_path, "decode")
+        # Read the stego header and only the pixels holding the payload (legacy images fall back to the stopping criteria)
+        return lsb_engine.decode_image_array(image, num_lsb, self.key)
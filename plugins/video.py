@@ -0,0 +1,330 @@
+import os  # Import os for operating system interactions
+import shutil, stat
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import payload_codec
+import stego_header
+import video_stream
+from plugins import ModalityPlugin, VIDEO_EXTENSIONS
+
+TEMP_FOLDER = "./temp/"
+VIDEO_END_BITS = '00000000' * 8  # 8 null bytes signified the end of a legacy (index-less) message
+DECODE_CHUNK_ELEMENTS = 1 << 16  # Channel values searched at a time for the legacy terminator
+START_FRAME = 1  # First frame carrying payload; frame 0 holds the index
+INDEX_BITS = stego_header.HEADER_BITS + stego_header.VIDEO_INDEX_BITS
+
+
+def frame_bit_ranges(total_bits, bits_per_frame, first_frame=0):
+    """Plan which slice of the payload bits each frame carries, as (frame index, start, stop)."""
+    return [(first_frame + index, start, min(start + bits_per_frame, total_bits))
+            for index, start in enumerate(range(0, total_bits, bits_per_frame))]
+
+
+def index_bits(num_lsb, length, first_frame, last_frame):
+    """Return the bits of the stego header and video index written into frame 0."""
+    header = stego_header.pack_header(stego_header.MODALITY_VIDEO, num_lsb, length)
+    return lsb_engine.bytes_to_bits(header + stego_header.pack_video_index(first_frame, last_frame))
+
+
+def read_video_index(flat):
+    """Return (header, index) from the LSBs of frame 0, or None for a legacy or clean video."""
+    header = lsb_engine.read_header(flat)
+    if header is None or header.modality != stego_header.MODALITY_VIDEO or flat.size < INDEX_BITS:
+        return None
+    bits = lsb_engine.extract_lsb(flat[stego_header.HEADER_BITS:INDEX_BITS], stego_header.HEADER_LSB)
+    index = stego_header.unpack_video_index(lsb_engine.bits_to_bytes(bits))
+    return None if index is None else (header, index)
+
+
+def find_terminated_payload(frames, n_lsb, stage):
+    """Return the legacy payload ahead of the null terminator in an iterable of flat frames, or None.
+
+    Each frame's LSBs are searched in chunks with find_zero_run, so frames after the terminator
+    are never requested from the iterable.
+    """
+    terminator = len(VIDEO_END_BITS)
+    chunks = []  # Bits read so far, kept until the terminator is found
+    total_bits = 0
+    carry = np.zeros(0, dtype=np.uint8)  # Last bits of the previous chunk, for runs that straddle chunks
+    for values in frames:
+        stage.add(bytes=values.nbytes, count=1)
+        for start in range(0, values.size, DECODE_CHUNK_ELEMENTS):
+            bits = lsb_engine.extract_lsb(values[start:start + DECODE_CHUNK_ELEMENTS], n_lsb)
+            window = np.concatenate([carry, bits])
+            end = lsb_engine.find_zero_run(window, terminator, total_bits - len(carry), n_lsb)
+            chunks.append(bits)
+            total_bits += len(bits)
+            if end is not None:
+                text_bits = np.concatenate(chunks)
+                text_bytes = -(-(end - terminator) // 8)  # A partial last byte still counts, as before
+                return lsb_engine.bits_to_bytes(text_bits[:text_bytes * 8])
+            carry = window[-(terminator - 1):]
+    return None
+
+
+def embed_frame(frame, bits, n_lsb):
+    """Embed a frame's slice of the payload into its raw buffer and return the frame."""
+    lsb_engine.embed_lsb(np.frombuffer(frame, dtype=np.uint8), bits, n_lsb)
+    return frame
+
+
+def embed_frame_file(frame_path, bits, n_lsb):
+    """Embed a frame's slice of the payload into an extracted PNG frame, in a worker process."""
+    import cv2
+    frame = cv2.imread(frame_path)
+    lsb_engine.embed_lsb(frame.reshape(-1), bits, n_lsb)
+    cv2.imwrite(frame_path, frame)
+
+
+class VideoPlugin(ModalityPlugin):
+    """LSB steganography over video frames, reassembled with ffmpeg.
+
+    By default frames stream through ffmpeg pipes; with streaming=False every frame is dumped to
+    PNG in temp_folder first, as the original implementation did. Either way the payload is
+    planned per frame up front and frames are embedded concurrently by a pool of workers.
+    Frame 0 carries a stego header and a frame index (first and last payload frame) in one LSB,
+    and the payload, compressed with codec when that makes it smaller, fills frames start_frame
+    onward. Decoders read frame 0, then seek straight to the payload frames; videos made before
+    the index existed are still decoded by scanning for their null terminator.
+    The stego video is written with video_codec, one of video_stream.VIDEO_CODECS (all lossless),
+    and x264/x265 use preset to trade encode speed against size; audio is always stream-copied.
+    """
+    name = "video"
+    extensions = VIDEO_EXTENSIONS
+
+    def __init__(self, temp_folder=TEMP_FOLDER, streaming=True, workers=None, codec="none", start_frame=START_FRAME,
+                 video_codec=video_stream.DEFAULT_VIDEO_CODEC, preset=video_stream.DEFAULT_PRESET):
+        self.temp_folder = temp_folder  # Working folder for extracted frames, one per concurrent worker
+        self.streaming = streaming
+        self.workers = workers or os.cpu_count() or 1
+        self.codec = codec
+        self.start_frame = start_frame
+        self.video_codec = video_codec
+        self.preset = preset
+
+    # Function to extract frames using moviepy and PIL
+    def frame_extract(self, video_path, action):
+        from moviepy.editor import VideoFileClip  # Loaded on first video only
+        from PIL import Image
+        if not os.path.exists(self.temp_folder):
+            os.makedirs(self.temp_folder)
+        with instrumentation.stage(self.name, action, "cover_read", path=video_path) as stage:
+            video_object = VideoFileClip(video_path)
+            for index, frame in enumerate(video_object.iter_frames()):
+                img = Image.fromarray(frame, 'RGB')
+                img.save(os.path.join(self.temp_folder, f'{index}.png'))
+                stage.add(bytes=frame.nbytes, count=1)
+
+    def extracted_frames(self):
+        """Return the extracted frame file names in frame order."""
+        return sorted([f for f in os.listdir(self.temp_folder) if f.endswith('.png')], key=lambda f: int(f.split('.')[0]))
+
+    def first_payload_frame(self):
+        return max(int(self.start_frame), 1)  # Frame 0 is reserved for the index
+
+    def capacity(self, cover_path, num_lsb):
+        info = video_stream.probe_video(cover_path)  # ffprobe reads the container metadata only
+        frames = max(info.frame_count - self.first_payload_frame(), 0)
+        return payload_codec.usable_capacity(frames * video_stream.frame_size(info) * int(num_lsb) // 8)
+
+    def encode(self, cover_path, payload, num_lsb):
+        with instrumentation.stage(self.name, "encode", "total", path=cover_path):
+            if self.streaming:
+                return self.encode_stream(cover_path, payload, num_lsb)
+            return self.encode_frames(cover_path, payload, num_lsb)
+
+    def frame_plan(self, payload, n_lsb, frame_elements, frame_count):
+        """Return {frame index: (bits, LSB count)} for the index frame and every payload frame."""
+        stored = payload_codec.pack_payload(payload, self.codec)
+        bits = lsb_engine.bytes_to_bits(stored)
+        ranges = frame_bit_ranges(len(bits), frame_elements * n_lsb, self.first_payload_frame())
+        last_frame = ranges[-1][0]
+        if frame_elements < INDEX_BITS or (frame_count and last_frame >= frame_count):
+            raise ValueError("Insufficient bytes, need longer video, smaller payload or more LSB.")
+        plan = {0: (index_bits(n_lsb, len(stored), ranges[0][0], last_frame), stego_header.HEADER_LSB)}
+        plan.update((index, (bits[start:stop], n_lsb)) for index, start, stop in ranges)
+        return plan, len(stored)
+
+    # Function to encode a payload into video frames as they stream from one ffmpeg process to another
+    def encode_stream(self, cover_path, payload, num_lsb):
+        n_lsb = int(num_lsb)
+        video_codec = video_stream.codec_args(self.video_codec, self.preset)
+        with instrumentation.stage(self.name, "encode", "probe", path=cover_path):
+            info = video_stream.probe_video(cover_path)
+        with instrumentation.stage(self.name, "encode", "bit_prep") as stage:
+            plan, stored_length = self.frame_plan(payload, n_lsb, video_stream.frame_size(info), info.frame_count)
+            stage.add(bytes=stored_length, count=len(plan))
+
+        stego_video_path = self.stego_path(cover_path, '.mkv')
+        read_stage = instrumentation.stage(self.name, "encode", "cover_read", path=cover_path, total=info.frame_count)
+        embed_stage = instrumentation.stage(self.name, "encode", "embed")
+        write_stage = instrumentation.stage(self.name, "encode", "write", path=stego_video_path)
+        frames_read = 0
+        in_flight = deque()  # Embedded (future) and untouched (bytearray) frames, in frame order
+        with ThreadPoolExecutor(self.workers) as pool, \
+                video_stream.FrameReader(cover_path, info) as reader, \
+                video_stream.FrameWriter(stego_video_path, info, cover_path, video_codec) as writer:
+            while True:
+                with read_stage.lap():
+                    frame = reader.read()
+                if frame is None:
+                    break
+                read_stage.add(bytes=len(frame), count=1)
+                if frames_read in plan:
+                    bits, frame_lsb = plan[frames_read]
+                    in_flight.append(pool.submit(self.embed_timed, embed_stage, frame, bits, frame_lsb))
+                else:
+                    in_flight.append(frame)  # Frames without payload pass through untouched
+                frames_read += 1
+                while len(in_flight) > 2 * self.workers:
+                    self.write_in_order(writer, in_flight, write_stage)
+            while in_flight:
+                self.write_in_order(writer, in_flight, write_stage)
+            if frames_read <= max(plan):
+                raise ValueError("Insufficient bytes, need longer video, smaller payload or more LSB.")
+            with write_stage.lap():
+                writer.close()  # Wait for ffmpeg to finish the file
+
+        read_stage.done()
+        embed_stage.done(bytes=stored_length)
+        write_stage.done()
+        return stego_video_path
+
+    def embed_timed(self, stage, frame, bits, n_lsb):
+        with stage.lap(count=1):
+            return embed_frame(frame, bits, n_lsb)
+
+    def write_in_order(self, writer, in_flight, stage):
+        """Write the oldest frame in flight, waiting for its embedding to finish if needed."""
+        item = in_flight.popleft()
+        frame = item.result() if isinstance(item, Future) else item
+        with stage.lap(bytes=len(frame), count=1):
+            writer.write(frame)
+
+    # Function to encode a payload into extracted video frames using LSB and then reassemble using ffmpeg
+    def encode_frames(self, cover_path, payload, num_lsb):
+        import cv2
+        n_lsb = int(num_lsb)
+        # The extracted frames are PNGs already, so the PNG codec just copies them into the container
+        video_codec = ["-c:v", "copy"] if self.video_codec == "png" else video_stream.codec_args(self.video_codec, self.preset)
+        info = video_stream.probe_video(cover_path)
+        if self.codec == "none" and len(payload_codec.to_bytes(payload)) > self.capacity(cover_path, n_lsb):
+            raise ValueError("Insufficient bytes, need longer video, smaller payload or more LSB.")  # Before extracting any frame
+        self.frame_extract(cover_path, "encode")
+        frames = self.extracted_frames()
+
+        with instrumentation.stage(self.name, "encode", "bit_prep") as stage:
+            frame = cv2.imread(os.path.join(self.temp_folder, frames[0]))
+            plan, stored_length = self.frame_plan(payload, n_lsb, frame.size, len(frames))
+            stage.add(bytes=stored_length, count=len(plan))
+
+        # Each frame's bits are known up front, so the frames are embedded independently
+        with instrumentation.stage(self.name, "encode", "embed") as stage:
+            indices = sorted(plan)
+            with ProcessPoolExecutor(self.workers) as pool:
+                list(pool.map(embed_frame_file, [os.path.join(self.temp_folder, frames[index]) for index in indices],
+                              [plan[index][0] for index in indices], [plan[index][1] for index in indices]))
+            stage.add(bytes=stored_length, count=len(indices))
+
+        frame_pattern = os.path.join(self.temp_folder, '%d.png')
+        stego_video_path = self.stego_path(cover_path, '.mkv')
+
+        with instrumentation.stage(self.name, "encode", "mux", path=stego_video_path) as stage:
+            # One ffmpeg run muxes the frames with the cover's audio, copied as is
+            video_stream.mux_frames(frame_pattern, info, stego_video_path, cover_path, video_codec)
+            stage.add(count=len(frames))
+
+        self.cleanup("encode")
+        return stego_video_path
+
+    def decode(self, stego_path, num_lsb):
+        with instrumentation.stage(self.name, "decode", "total", path=stego_path):
+            if self.streaming:
+                return self.decode_stream(stego_path, num_lsb)
+            return self.decode_frames(stego_path, num_lsb)
+
+    # Function to decode a payload by reading frame 0's index, then only the frames it names
+    def decode_stream(self, stego_path, num_lsb):
+        with instrumentation.stage(self.name, "decode", "probe", path=stego_path):
+            info = video_stream.probe_video(stego_path)
+        with instrumentation.stage(self.name, "decode", "cover_read", path=stego_path) as stage, \
+                video_stream.FrameReader(stego_path, info, frame_count=1) as reader:
+            first = reader.read()
+            stage.add(bytes=len(first or b''), count=1)
+        if first is None:
+            return None
+        found = read_video_index(np.frombuffer(first, dtype=np.uint8))
+        if found is None:
+            return self.decode_terminated_stream(stego_path, num_lsb, info)
+        header, index = found
+
+        needed = header.length * 8
+        bits = []
+        with instrumentation.stage(self.name, "decode", "extract", path=stego_path,
+                                   total=index.last_frame - index.first_frame + 1) as stage, \
+                video_stream.FrameReader(stego_path, info, index.first_frame,
+                                         index.last_frame - index.first_frame + 1) as reader:
+            for frame in reader:  # ffmpeg seeks to the first payload frame and stops after the last
+                stage.add(bytes=len(frame), count=1)
+                bits.append(lsb_engine.extract_lsb(np.frombuffer(frame, dtype=np.uint8), header.num_lsb, needed))
+                needed -= len(bits[-1])
+                if needed <= 0:
+                    break
+        if needed > 0:
+            raise ValueError("Header payload length exceeds the frames in the video.")
+        with instrumentation.stage(self.name, "decode", "unpack"):
+            return payload_codec.unpack_payload(lsb_engine.bits_to_bytes(np.concatenate(bits)), header)
+
+    # Function to decode a legacy payload from video frames as ffmpeg decodes them, stopping at the terminator
+    def decode_terminated_stream(self, stego_path, num_lsb, info):
+        with instrumentation.stage(self.name, "decode", "extract", path=stego_path, total=info.frame_count) as stage, \
+                video_stream.FrameReader(stego_path, info) as reader:
+            # Returning from the with block stops ffmpeg before it decodes the rest of the video
+            frames = (np.frombuffer(frame, dtype=np.uint8) for frame in reader)
+            return find_terminated_payload(frames, int(num_lsb), stage)
+
+    # Function to decode a payload from extracted video frames using LSB
+    def decode_frames(self, stego_path, num_lsb):
+        import cv2
+        n_lsb = int(num_lsb)
+        self.frame_extract(stego_path, "decode")
+        frames = self.extracted_frames()
+
+        try:
+            with instrumentation.stage(self.name, "decode", "extract", path=stego_path) as stage:
+                found = read_video_index(cv2.imread(os.path.join(self.temp_folder, frames[0])).reshape(-1)) if frames else None
+                if found is not None:
+                    header, index = found
+                    needed = header.length * 8
+                    bits = []
+                    for frame_file in frames[index.first_frame:index.last_frame + 1]:  # Only the frames the index names
+                        frame = cv2.imread(os.path.join(self.temp_folder, frame_file))
+                        stage.add(bytes=frame.nbytes, count=1)
+                        bits.append(lsb_engine.extract_lsb(frame.reshape(-1), header.num_lsb, needed))
+                        needed -= len(bits[-1])
+                        if needed <= 0:
+                            return payload_codec.unpack_payload(lsb_engine.bits_to_bytes(np.concatenate(bits)), header)
+                    raise ValueError("Header payload length exceeds the frames in the video.")
+
+                # Legacy videos: search the frames' LSBs for the null terminator, reading frames only as needed
+                pixels = (cv2.imread(os.path.join(self.temp_folder, frame_file)).reshape(-1) for frame_file in frames)
+                return find_terminated_payload(pixels, n_lsb, stage)
+        finally:
+            self.cleanup("decode")
+
+    def cleanup(self, action):
+        with instrumentation.stage(self.name, action, "cleanup", path=self.temp_folder):
+            if os.path.exists(self.temp_folder):
+                try:
+                    shutil.rmtree(self.temp_folder, onerror=self.remove_readonly)
+                except OSError as e:
+                    print("Error: %s : %s" % (self.temp_folder, e.strerror))
+
+    def remove_readonly(self, func, path, _):
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
@@ -0,0 +1,74 @@
+"""Thumbnail cache for the GUI image previews.
+
+Thumbnails are keyed by path, modification time, file size and thumbnail size, so a file that
+changes on disk is never shown stale, and the least recently used ones are dropped once the
+cache is full. Files are decoded at reduced scale: thumbnail() has PIL draft() JPEGs straight to
+1/2, 1/4 or 1/8 size and reduce() other formats by whole factors before the final resampling.
+Freshly encoded images are shrunk from the array still in memory instead of re-read from disk.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+PREVIEW_SIZE = (500, 500)
+MAX_ENTRIES = 32  # Thumbnails kept; at most 500x500 RGB each, so under 25 MB in all
+
+
+def load_thumbnail(path, size=PREVIEW_SIZE):
+    """Decode path at reduced scale and return a thumbnail no bigger than size."""
+    with Image.open(path) as image:
+        image.thumbnail(size, reducing_gap=2.0)  # draft()/reduce() first, then a cheap final resample
+        image.load()  # thumbnail() leaves images already small enough unloaded, and the file closes below
+    return image
+
+
+def thumbnail_from_array(image, size=PREVIEW_SIZE):
+    """Return a thumbnail of a BGR array, as cv2 holds it, without touching the disk."""
+    import cv2
+    height, width = image.shape[:2]
+    scale = min(size[0] / width, size[1] / height)
+    if scale < 1:
+        image = cv2.resize(image, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                           interpolation=cv2.INTER_AREA)
+    return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+
+class PreviewCache:
+    """A least recently used cache of thumbnails, shared by the GUI and its job threads."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> thumbnail, least recently used first
+        self.lock = threading.Lock()
+
+    def key(self, path, size):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(size)
+
+    def get(self, path, size=PREVIEW_SIZE):
+        """Return the thumbnail of path, decoding the file only if it isn't cached."""
+        key = self.key(path, size)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        thumbnail = load_thumbnail(path, size)
+        self.store(key, thumbnail)
+        return thumbnail
+
+    def put(self, path, thumbnail, size=PREVIEW_SIZE):
+        """Cache a thumbnail made from the file's contents, e.g. the image that was just written to path."""
+        self.store(self.key(path, size), thumbnail)
+
+    def store(self, key, thumbnail):
+        with self.lock:
+            self.entries[key] = thumbnail
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
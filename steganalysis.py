@@ -0,0 +1,285 @@
+"""Steganalysis of LSB embedding in images and WAV audio.
+
+Three detectors look at the least significant bit plane of a file:
+
+- chi_square: Westfeld and Pfitzmann's pairs-of-values test. LSB replacement evens out the
+  counts of each value pair (2k, 2k+1). The test's p-value is taken over growing prefixes of the
+  samples in embedding order, so a payload written from the start of the file is found even
+  when it fills only part of it.
+- rs: Fridrich, Goljan and Du's RS analysis, which estimates the embedding rate from how
+  flipping LSBs changes the number of regular and singular groups of four samples.
+- spa: Dumitrescu, Wu and Wang's sample pair analysis, which estimates the embedding rate from
+  the parity structure of pairs of neighbouring samples.
+
+Rates are the estimated fraction of samples whose LSB carries payload (1.0 = every LSB used).
+Every statistic is computed with numpy histograms and whole-array operations, and the scanner
+spreads files over a process pool.
+
+Examples:
+    python steganalysis.py suspicious.png song.wav
+    python steganalysis.py covers/ --workers 8 --json
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np  # Import numpy for array manipulation
+
+import mmap_engine
+import plugins
+
+ANALYSIS_EXTENSIONS = plugins.IMAGE_EXTENSIONS + plugins.AUDIO_EXTENSIONS
+CHI_SQUARE_PREFIXES = 20  # The pairs-of-values test is run on the first 5%, 10%, ... of the samples
+CHI_SQUARE_MIN_EXPECTED = 5  # Value pairs expected fewer times than this are left out of the test
+CHI_SQUARE_THRESHOLD = 0.95  # p-value above which a prefix is taken to carry payload
+RATE_THRESHOLD = 0.1  # RS/SPA estimated rate at which a file counts as suspicious; clean JPEGs reach about 0.05
+SUSPICIOUS_LIKELIHOOD = 0.95
+MAX_HISTOGRAM_BINS = 1 << 17  # Wider sample ranges get their value pairs renumbered first
+SCAN_CHUNKSIZE = 8  # Files handed to a worker at a time
+
+
+def chi_square_sf(statistic, dof):
+    """Return P(X >= statistic) for a chi-square variable X with dof degrees of freedom."""
+    a, x = dof / 2.0, statistic / 2.0
+    if x <= 0:
+        return 1.0
+    log_scale = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        # Series for the regularized lower incomplete gamma function
+        term = total = 1.0 / a
+        n = a
+        while term > total * 1e-12:
+            n += 1
+            term *= x / n
+            total += term
+        return min(max(1.0 - total * math.exp(log_scale), 0.0), 1.0)
+    # Continued fraction for the regularized upper incomplete gamma function (modified Lentz)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        if abs(d * c - 1) < 1e-12:
+            break
+    return min(max(math.exp(log_scale) * h, 0.0), 1.0)
+
+
+def pairs_of_values_p(histogram):
+    """Return the chi-square p-value that a histogram's value pairs (2k, 2k+1) were evened out."""
+    even, odd = histogram[0::2], histogram[1::2]
+    expected = (even + odd) / 2
+    used = expected >= CHI_SQUARE_MIN_EXPECTED
+    if np.count_nonzero(used) < 2:
+        return 0.0
+    statistic = float((((even[used] - expected[used]) ** 2) / expected[used]).sum())
+    return chi_square_sf(statistic, np.count_nonzero(used) - 1)
+
+
+def chi_square_profile(stream, prefixes=CHI_SQUARE_PREFIXES):
+    """Return the pairs-of-values p-value of each growing prefix of stream, in embedding order."""
+    low = int(stream.min()) & ~1  # Start on an even value so histogram bins 2k, 2k+1 stay pairs
+    bins = int(stream.max()) - low + 1
+    bins += bins % 2
+    if bins > MAX_HISTOGRAM_BINS:
+        # 24 and 32-bit audio: number only the value pairs that occur, keeping each value's LSB
+        pairs, index = np.unique(stream >> 1, return_inverse=True)
+        stream, low, bins = index.reshape(-1) * 2 + (stream & 1), 0, 2 * len(pairs)
+    chunk = -(-stream.size // prefixes)
+    histogram = np.zeros(bins, dtype=np.int64)
+    profile = []
+    for start in range(0, stream.size, chunk):
+        histogram += np.bincount(stream[start:start + chunk] - low, minlength=bins)
+        profile.append(pairs_of_values_p(histogram))
+    return profile
+
+
+def group_variation(g0, g1, g2, g3):
+    """Return the discrimination function of RS analysis: the variation inside each group of four."""
+    return np.abs(g1 - g0) + np.abs(g2 - g1) + np.abs(g3 - g2)
+
+
+def rs_counts(g0, g1, g2, g3):
+    """Return the fractions of regular and singular groups under the mask [0, 1, 1, 0] and its negation."""
+    base = group_variation(g0, g1, g2, g3)
+    flipped = group_variation(g0, g1 ^ 1, g2 ^ 1, g3)  # F1: 2k <-> 2k+1 on the two inner samples
+    shifted = group_variation(g0, ((g1 + 1) ^ 1) - 1, ((g2 + 1) ^ 1) - 1, g3)  # F-1: 2k-1 <-> 2k
+    total = base.size
+    return (np.count_nonzero(flipped > base) / total, np.count_nonzero(flipped < base) / total,
+            np.count_nonzero(shifted > base) / total, np.count_nonzero(shifted < base) / total)
+
+
+def rs_rate(planes):
+    """Estimate the embedding rate with RS analysis on groups of four neighbouring samples."""
+    width = planes.shape[-1] // 4 * 4
+    if width == 0:
+        return 0.0
+    dtype = np.int16 if planes.dtype == np.uint8 else np.int32  # Room for F-1 to step past the value range
+    columns = [planes[..., i:width:4].astype(dtype) for i in range(4)]  # Sample i of every group
+    r, s, r_neg, s_neg = rs_counts(*columns)
+    r_flip, s_flip, r_neg_flip, s_neg_flip = rs_counts(*(column ^ 1 for column in columns))  # Every LSB flipped
+    d0, d1 = r - s, r_flip - s_flip
+    d_neg0, d_neg1 = r_neg - s_neg, r_neg_flip - s_neg_flip
+    root = solve_quadratic(2 * (d1 + d0), d_neg0 - d_neg1 - d1 - 3 * d0, d0 - d_neg0)
+    if root is None or root == 0.5:
+        return 0.0
+    return min(max(root / (root - 0.5), 0.0), 1.0)
+
+
+def spa_rate(planes):
+    """Estimate the embedding rate with sample pair analysis on horizontally adjacent samples."""
+    u, v = planes[..., :-1], planes[..., 1:]
+    total = u.size
+    if total == 0:
+        return 0.0
+    v_even = (v & 1) == 0
+    x = np.count_nonzero(np.where(v_even, u < v, u > v))
+    y = np.count_nonzero(np.where(v_even, u > v, u < v))
+    same_pair = np.count_nonzero((u >> 1) == (v >> 1))  # Pairs differing at most in the LSB
+    root = solve_quadratic(0.5 * same_pair, 2 * x - total, y - x)
+    return 0.0 if root is None else min(max(root, 0.0), 1.0)
+
+
+def solve_quadratic(a, b, c):
+    """Return the root of a*x^2 + b*x + c = 0 closest to zero, or None if there is none."""
+    if abs(a) < 1e-12:
+        return -c / b if b else None
+    # Near full embedding, sampling noise can push the discriminant just below zero; take the double root
+    discriminant = max(b * b - 4 * a * c, 0.0)
+    roots = ((-b + math.sqrt(discriminant)) / (2 * a), (-b - math.sqrt(discriminant)) / (2 * a))
+    return min(roots, key=abs)
+
+
+def analyze_samples(stream, planes):
+    """Run every detector on one file's samples.
+
+    stream holds the samples in the order the encoders embed them, and planes the same samples
+    as (channel, row, column) arrays whose last axis runs between neighbouring samples.
+    """
+    profile = chi_square_profile(stream)
+    extent = 0
+    while extent < len(profile) and profile[extent] >= CHI_SQUARE_THRESHOLD:
+        extent += 1
+    rs, spa = rs_rate(planes), spa_rate(planes)
+    rate = (rs + spa) / 2
+    likelihood = max(profile[0], min(rate / RATE_THRESHOLD, 1.0))
+    return {"chi_square": float(profile[0]), "chi_square_full": float(profile[-1]),
+            "chi_square_extent": extent / len(profile), "rs": float(rs), "spa": float(spa), "rate": float(rate),
+            "likelihood": float(likelihood), "suspicious": bool(likelihood >= SUSPICIOUS_LIKELIHOOD)}
+
+
+def image_samples(path):
+    """Return (stream, planes) for an image, read as BGR like the image encoders do."""
+    import cv2
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Cannot read image file: {path}")
+    return image.reshape(-1), image.transpose(2, 0, 1)
+
+
+def wav_samples(path):
+    """Return (stream, planes) for a PCM WAV file, read through a memory map."""
+    info = mmap_engine.parse_wav(path)
+    if info is None or info.sampwidth > 4:
+        raise ValueError(f"Steganalysis needs an 8 to 32-bit PCM WAV file: {path}")
+    count = info.size // info.sampwidth // info.nchannels * info.nchannels
+    raw = np.memmap(path, dtype=np.uint8, mode='r', offset=info.offset, shape=(count, info.sampwidth))
+    if info.sampwidth == 1:
+        stream = np.array(raw[:, 0])  # 8-bit PCM is unsigned
+    else:
+        # Little-endian signed samples: sign-extend the top byte and add the lower ones under it
+        stream = raw[:, -1].astype(np.int8).astype(np.int32)
+        for byte in range(info.sampwidth - 2, -1, -1):
+            stream = (stream << 8) | raw[:, byte]
+    return stream, stream.reshape(-1, info.nchannels).T[:, None, :]
+
+
+def analyze_file(path):
+    """Return the steganalysis record of one image or WAV file."""
+    start = time.perf_counter()
+    record = {"path": path, "modality": None, "status": "ok", "error": None}
+    try:
+        if path.lower().endswith(plugins.AUDIO_EXTENSIONS):
+            record["modality"] = "audio"
+            stream, planes = wav_samples(path)
+        else:
+            record["modality"] = "image"
+            stream, planes = image_samples(path)
+        record.update(analyze_samples(stream, planes))
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def find_files(paths):
+    """Expand folders into the image and WAV files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(ANALYSIS_EXTENSIONS)))
+        else:
+            files.append(path)
+    return files
+
+
+def scan(paths, workers=None, report=None):
+    """Analyse every file across a process pool, calling report with each record in order."""
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for record in pool.map(analyze_file, paths, chunksize=SCAN_CHUNKSIZE):
+            records.append(record)
+            if report:
+                report(record)
+    return records
+
+
+def print_record(record):
+    if record["status"] != "ok":
+        print(f"[error]      {record['path']}: {record['error']}")
+        return
+    label = "[suspicious]" if record["suspicious"] else "[clean]     "
+    print(f"{label} {record['path']}: likelihood {record['likelihood']:.2f} "
+          f"(chi-square p {record['chi_square']:.2f} over {record['chi_square_extent']:.0%}, "
+          f"RS {record['rs']:.3f}, SPA {record['spa']:.3f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect LSB embedding in images and WAV files.")
+    parser.add_argument("paths", nargs="+", help="Image or WAV files, or folders of them")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--json", action="store_true", help="Print records and summary as JSON")
+    args = parser.parse_args(argv)
+
+    files = find_files(args.paths)
+    start = time.perf_counter()
+    records = scan(files, args.workers, report=None if args.json else print_record)
+    seconds = time.perf_counter() - start
+    summary = {"files": len(records), "seconds": seconds,
+               "files_per_minute": len(records) / seconds * 60 if seconds else 0.0,
+               "suspicious": sum(record.get("suspicious", False) for record in records),
+               "errors": sum(record["status"] != "ok" for record in records)}
+
+    if args.json:
+        json.dump({"results": records, "summary": summary}, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"{summary['suspicious']} of {summary['files']} files suspicious, {summary['errors']} errors, "
+              f"in {seconds:.2f}s ({summary['files_per_minute']:.0f} files/min)")
+    return 1 if summary["suspicious"] or summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
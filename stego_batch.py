@@ -0,0 +1,252 @@
+"""Headless batch encoder/decoder that runs steganography jobs across a process pool.
+
+Examples:
+    python stego_batch.py encode --covers covers/ --payload payload.txt --lsb 2 --workers 8
+    python stego_batch.py encode --manifest jobs.csv
+    python stego_batch.py decode --covers stego/ --lsb 2 --output-dir decoded/
+
+A manifest is a CSV file with one job per line: cover,payload,lsb for encoding or cover,lsb for
+decoding. Relative paths are resolved against the manifest's folder and lines starting with # are
+skipped.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import capacity_planner
+import instrumentation
+import plugins
+import video_stream
+
+
+def load_manifest(manifest_path, action):
+    """Read (cover, payload, lsb) jobs from a CSV manifest."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    with open(manifest_path, newline='') as file:
+        for row in csv.reader(file):
+            row = [field.strip() for field in row]
+            if not row or not row[0] or row[0].startswith('#'):
+                continue
+            cover = os.path.join(base, row[0])
+            if action == "encode":
+                if len(row) < 3:
+                    raise ValueError(f"Manifest line needs cover,payload,lsb: {','.join(row)}")
+                jobs.append((cover, os.path.join(base, row[1]), int(row[2])))
+            else:
+                jobs.append((cover, None, int(row[1]) if len(row) > 1 and row[1] else 1))
+    return jobs
+
+
+def find_covers(directory, method, skip_stego=False):
+    """Return every file in directory handled by a plugin of the given method."""
+    extensions = plugins.supported_extensions(method)
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(extensions) and not (skip_stego and '_stego' in name))
+
+
+def build_jobs(args):
+    """Turn the command-line options into a list of (cover, payload, lsb) jobs."""
+    jobs = []
+    for manifest in args.manifest or []:
+        jobs.extend(load_manifest(manifest, args.action))
+    for directory in args.covers or []:
+        if args.action == "encode" and not args.payload:
+            raise ValueError("--payload is required when encoding a directory of covers")
+        jobs.extend((cover, args.payload, args.lsb) for cover in find_covers(directory, args.method, skip_stego=args.action == "encode"))
+    return jobs
+
+
+def decoded_output_path(stego_path, output_dir):
+    """Return where the decoded payload of stego_path is written."""
+    name = os.path.splitext(os.path.basename(stego_path))[0] + '_decoded.txt'
+    return os.path.join(output_dir or os.path.dirname(stego_path), name)
+
+
+def configure_plugin(plugin, options):
+    """Set the plugin options (mapped, in_place, tiled, ...) that the plugin supports."""
+    for name, value in (options or {}).items():
+        if hasattr(plugin, name):
+            setattr(plugin, name, value)
+
+
+def run_job_result(action, cover_path, payload_path, num_lsb):
+    """Return an empty result record for a job."""
+    return {"action": action, "cover": cover_path, "payload": payload_path, "lsb": num_lsb,
+            "bytes": 0, "seconds": 0.0, "status": "ok", "output": None, "error": None}
+
+
+def configure_instrumentation(metrics_path=None, verbose=False):
+    """Register this process's stage sinks, once per worker process."""
+    global _INSTRUMENTED
+    if _INSTRUMENTED:
+        return
+    _INSTRUMENTED = True
+    if metrics_path:
+        instrumentation.add_sink(instrumentation.JsonLinesSink(metrics_path))
+    if verbose:
+        instrumentation.add_sink(instrumentation.print_sink)
+
+
+_INSTRUMENTED = False
+
+
+def run_job(action, method, cover_path, payload_path, num_lsb, output_dir=None, quiet=True, options=None, metrics_path=None):
+    """Run one encode or decode job in a worker process and return its result record."""
+    configure_instrumentation(metrics_path, verbose=not quiet)
+    result = run_job_result(action, cover_path, payload_path, num_lsb)
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log) if quiet else contextlib.nullcontext():
+            name = plugins.plugin_name_for_path(cover_path, method)
+            if name is None:
+                raise ValueError(f"Cover file type not supported: {os.path.basename(cover_path)}")
+            plugin = plugins.create_plugin(name)  # Its own instance, so configure_plugin never touches the shared one
+            if plugin.name == "video":
+                plugin.temp_folder = f"./temp-{os.getpid()}/"  # Keep concurrent video jobs apart
+            configure_plugin(plugin, options)
+            result["bytes"] = os.path.getsize(cover_path)
+            if action == "encode":
+                with open(payload_path, 'rb') as file:
+                    payload = file.read()
+                result["output"] = plugin.encode(cover_path, payload, num_lsb)
+            else:
+                decoded_data = plugin.decode(cover_path, num_lsb)
+                if decoded_data is None:
+                    raise ValueError("No message detected")
+                result["output"] = decoded_output_path(cover_path, output_dir)
+                with open(result["output"], "wb") as file:
+                    file.write(decoded_data)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def plan_jobs(jobs, method="lsb", options=None):
+    """Split encode jobs into those that fit their covers and error results for those that don't.
+
+    Capacities come from header and metadata reads only, so oversized jobs are rejected before
+    any worker starts. Payloads that will be compressed can't be sized up front and all go ahead.
+    """
+    if (options or {}).get("codec", "none") != "none":
+        return jobs, []
+    accepted, rejected = [], []
+    for cover, payload, lsb in jobs:
+        try:
+            capacity_planner.check_fits(cover, os.path.getsize(payload), lsb, method)
+            accepted.append((cover, payload, lsb))
+        except Exception as e:
+            result = run_job_result("encode", cover, payload, lsb)
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+            rejected.append(result)
+    return accepted, rejected
+
+
+def run_batch(action, jobs, method="lsb", workers=None, output_dir=None, quiet=True, report=None, options=None,
+              metrics_path=None):
+    """Run jobs across a process pool, calling report with each result as it finishes."""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, action, method, cover, payload, lsb, output_dir, quiet, options, metrics_path)
+                   for cover, payload, lsb in jobs]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            if report:
+                report(result)
+    return results
+
+
+def summarize(results, seconds):
+    """Aggregate job results into totals and throughput."""
+    total_bytes = sum(result["bytes"] for result in results)
+    return {
+        "jobs": len(results),
+        "succeeded": sum(result["status"] == "ok" for result in results),
+        "failed": sum(result["status"] != "ok" for result in results),
+        "bytes": total_bytes,
+        "seconds": seconds,
+        "jobs_per_second": len(results) / seconds if seconds else 0.0,
+        "mb_per_second": total_bytes / 1e6 / seconds if seconds else 0.0,
+    }
+
+
+def print_result(result):
+    if result["status"] == "ok":
+        print(f"[ok]    {result['cover']} -> {result['output']} ({result['seconds']:.3f}s)")
+    else:
+        print(f"[error] {result['cover']}: {result['error']}")
+
+
+def plugin_options(args):
+    """Collect the plugin options chosen on the command line."""
+    return {"mapped": args.mmap or args.in_place, "in_place": args.in_place, "tiled": args.tiled, "codec": args.compress,
+            "video_codec": args.video_codec, "preset": args.preset, "key": args.key}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch LSB/BPCS steganography without the GUI.")
+    parser.add_argument("action", choices=["encode", "decode"])
+    parser.add_argument("--covers", action="append", help="Folder of cover (or stego) files; may be repeated")
+    parser.add_argument("--manifest", action="append", help="CSV manifest of jobs; may be repeated")
+    parser.add_argument("--payload", help="Payload file used for every cover found with --covers")
+    parser.add_argument("--lsb", type=int, default=1, choices=range(1, 9), help="Number of LSBs (default 1)")
+    parser.add_argument("--method", choices=["lsb", "bpcs"], default="lsb")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--output-dir", help="Folder for decoded payloads (default: next to each stego file)")
+    parser.add_argument("--mmap", action="store_true", help="Memory map BMP/WAV covers and rewrite only the payload bytes")
+    parser.add_argument("--in-place", action="store_true", help="With --mmap or --tiled, modify the covers themselves")
+    parser.add_argument("--tiled", action="store_true", help="Process uncompressed BMP/PPM/TIFF covers in row strips")
+    parser.add_argument("--compress", choices=["none", "zlib", "lzma"], default="none",
+                        help="Compress payloads before embedding when it makes them smaller (default none)")
+    parser.add_argument("--video-codec", choices=list(video_stream.VIDEO_CODECS), default=video_stream.DEFAULT_VIDEO_CODEC,
+                        help=f"Lossless codec for stego videos (default {video_stream.DEFAULT_VIDEO_CODEC})")
+    parser.add_argument("--preset", choices=video_stream.PRESETS, default=video_stream.DEFAULT_PRESET,
+                        help=f"x264/x265 speed preset; slower presets give smaller videos (default {video_stream.DEFAULT_PRESET})")
+    parser.add_argument("--key", help="Scatter image and WAV payload bits in an order seeded by this key; decode needs it too")
+    parser.add_argument("--metrics", help="Append per-stage timings of every job to this JSON-lines file")
+    parser.add_argument("--json", action="store_true", help="Print results and summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the encoders' progress output")
+    args = parser.parse_args(argv)
+
+    if not args.covers and not args.manifest:
+        parser.error("give at least one --covers folder or --manifest file")
+    try:
+        jobs = build_jobs(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    report = None if args.json else print_result
+    rejected = []
+    if args.action == "encode":
+        jobs, rejected = plan_jobs(jobs, args.method, plugin_options(args))
+        for result in rejected if report else []:
+            report(result)
+    results = rejected + run_batch(args.action, jobs, args.method, args.workers, args.output_dir,
+                                   quiet=not args.verbose, report=report, options=plugin_options(args),
+                                   metrics_path=args.metrics)
+    summary = summarize(results, time.perf_counter() - start)
+
+    if args.json:
+        json.dump({"results": results, "summary": summary}, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"{summary['succeeded']}/{summary['jobs']} jobs succeeded in {summary['seconds']:.2f}s "
+              f"({summary['jobs_per_second']:.2f} jobs/s, {summary['mb_per_second']:.2f} MB/s)")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
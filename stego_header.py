@@ -0,0 +1,79 @@
+import struct  # Import struct for packing the header fields
+from collections import namedtuple
+
+# Versioned header written in front of the payload so decoders know exactly how much to read
+HEADER_MAGIC = b"LSBS"
+HEADER_VERSION = 2  # Version 2 payloads start with a payload_codec byte
+HEADER_VERSIONS = (1, 2)  # Versions the decoders still read
+HEADER_FORMAT = ">4sBBBQ"  # magic, version, modality, number of LSBs, payload length in bytes
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+HEADER_BITS = HEADER_SIZE * 8
+HEADER_LSB = 1  # The header always uses one LSB so it can be read before the LSB count is known
+
+# Modality codes recorded in the header
+MODALITY_IMAGE = 1
+MODALITY_AUDIO = 2
+MODALITY_VIDEO = 3
+MODALITY_BPCS = 4
+MODALITIES = (MODALITY_IMAGE, MODALITY_AUDIO, MODALITY_VIDEO, MODALITY_BPCS)
+
+StegoHeader = namedtuple("StegoHeader", ["version", "modality", "num_lsb", "length"])
+
+# Video index written right after a video's header in the first frame, so decoders can seek to the payload
+VIDEO_INDEX_FORMAT = ">II"  # first and last frame carrying payload bits
+VIDEO_INDEX_SIZE = struct.calcsize(VIDEO_INDEX_FORMAT)
+VIDEO_INDEX_BITS = VIDEO_INDEX_SIZE * 8
+
+VideoIndex = namedtuple("VideoIndex", ["first_frame", "last_frame"])
+
+
+def pack_header(modality, num_lsb, length):
+    """Build the header bytes for a payload of the given length."""
+    return struct.pack(HEADER_FORMAT, HEADER_MAGIC, HEADER_VERSION, modality, num_lsb, length)
+
+
+def unpack_header(data):
+    """Parse header bytes, returning a StegoHeader or None if the data is not a valid header."""
+    if len(data) < HEADER_SIZE:
+        return None
+    magic, version, modality, num_lsb, length = struct.unpack(HEADER_FORMAT, data[:HEADER_SIZE])
+    if magic != HEADER_MAGIC or version not in HEADER_VERSIONS:
+        return None  # Legacy sentinel format or no payload at all
+    if modality not in MODALITIES or not 1 <= num_lsb <= 8:
+        return None
+    return StegoHeader(version, modality, num_lsb, length)
+
+
+def pack_video_index(first_frame, last_frame):
+    return struct.pack(VIDEO_INDEX_FORMAT, first_frame, last_frame)
+
+
+def unpack_video_index(data):
+    """Parse video index bytes, returning a VideoIndex or None if the frame range is invalid."""
+    if len(data) < VIDEO_INDEX_SIZE:
+        return None
+    first_frame, last_frame = struct.unpack(VIDEO_INDEX_FORMAT, data[:VIDEO_INDEX_SIZE])
+    if first_frame < 1 or last_frame < first_frame:
+        return None  # Frame 0 holds the index itself
+    return VideoIndex(first_frame, last_frame)
+
+# Shard header written in front of each piece of a payload split across several covers
+SHARD_MAGIC = b"LSBP"
+SHARD_FORMAT = ">4s8sHHI"  # magic, payload id, sequence number, shard count, CRC-32 of the shard data
+SHARD_SIZE = struct.calcsize(SHARD_FORMAT)
+
+ShardHeader = namedtuple("ShardHeader", ["payload_id", "sequence", "total", "checksum"])
+
+
+def pack_shard_header(payload_id, sequence, total, checksum):
+    return struct.pack(SHARD_FORMAT, SHARD_MAGIC, payload_id, sequence, total, checksum)
+
+
+def unpack_shard_header(data):
+    """Parse shard header bytes, returning a ShardHeader or None if the data is not a shard."""
+    if len(data) < SHARD_SIZE:
+        return None
+    magic, payload_id, sequence, total, checksum = struct.unpack(SHARD_FORMAT, data[:SHARD_SIZE])
+    if magic != SHARD_MAGIC or not sequence < total:
+        return None
+    return ShardHeader(payload_id, sequence, total, checksum)
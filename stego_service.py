@@ -0,0 +1,305 @@
+"""Local HTTP service that encodes and decodes payloads for other programs, without the GUI.
+
+Covers and payloads are uploaded as multipart/form-data, options go in the query string, and the
+stego file or decoded payload comes back as the response body. Jobs run on a bounded process pool
+in a private temporary folder each, so nothing is left at fixed paths such as decoded_text.txt or
+./temp. Once every worker is busy and the queue is full, new jobs are turned away with 503 and a
+Retry-After header instead of piling up. The service only listens on 127.0.0.1.
+
+Examples:
+    python stego_service.py --port 8765 --workers 4 --queue 8
+    curl -F cover=@duck.png -F payload=@mytext.txt "http://127.0.0.1:8765/encode?lsb=2" -o duck_stego.png
+    curl -F cover=@duck_stego.png "http://127.0.0.1:8765/decode?lsb=2"
+    curl http://127.0.0.1:8765/health
+    curl http://127.0.0.1:8765/metrics
+
+Endpoints:
+    POST /encode   fields cover and payload; query lsb, method (lsb/bpcs), codec, video_codec, preset, key
+    POST /decode   field cover (the stego file); query lsb, method, key
+    GET  /health   pool size and the number of jobs in flight
+    GET  /metrics  job counters and per-stage timing totals of every finished job
+"""
+import argparse
+import email.message
+import email.parser
+import email.policy
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import capacity_planner
+import instrumentation
+import plugins
+import stego_batch
+
+HOST = "127.0.0.1"  # Loopback only; the service is for programs on the same machine
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 8  # Jobs allowed to wait for a worker before new ones are turned away
+MAX_UPLOAD = 512 * 1024 * 1024  # Request bodies larger than this are refused with 413
+RETRY_AFTER = 1  # Seconds a turned-away client is told to wait
+OPTIONS = ("codec", "video_codec", "preset", "key")  # Plugin options taken from the query string
+
+
+class ServiceBusy(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+def run_service_job(action, method, filename, cover, payload, num_lsb, options):
+    """Encode or decode uploaded bytes in a worker process and return the output and stage records.
+
+    The job runs in its own temporary folder, which is removed afterwards with everything the
+    plugin wrote there (stego file, extracted video frames, ...).
+    """
+    records = []
+    instrumentation.add_sink(records.append)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix="stego-") as workdir:
+            os.chdir(workdir)  # Plugins name their outputs and temp folders relative to the cover
+            cover_path = "cover" + os.path.splitext(filename)[1].lower()
+            try:
+                name = plugins.plugin_name_for_path(cover_path, method)
+                if name is None:
+                    raise ValueError(f"Cover file type not supported: {filename}")
+                with open(cover_path, "wb") as file:
+                    file.write(cover)
+                plugin = plugins.create_plugin(name)
+                stego_batch.configure_plugin(plugin, options)
+                if action == "decode":
+                    data = plugin.decode(cover_path, num_lsb)
+                    if data is None:
+                        raise ValueError("No message detected")
+                    output_name = os.path.splitext(filename)[0] + "_decoded.txt"
+                else:
+                    if options.get("codec", "none") == "none":
+                        capacity_planner.check_fits(cover_path, len(payload), num_lsb, method)
+                    output_path = plugin.encode(cover_path, payload, num_lsb)
+                    with open(output_path, "rb") as file:
+                        data = file.read()
+                    # cover_stego.png -> <upload name>_stego.png
+                    output_name = os.path.splitext(filename)[0] + os.path.basename(output_path)[len("cover"):]
+            except (ValueError, RuntimeError) as e:
+                # Messages such as the capacity check name the file; give the client back its own name
+                kind = ValueError if isinstance(e, ValueError) else RuntimeError  # Keeps the 422/500 status
+                raise kind(str(e).replace(cover_path, filename)) from None
+            finally:
+                os.chdir(cwd)
+    finally:
+        instrumentation.remove_sink(records.append)
+    return {"name": output_name, "data": data, "records": records}
+
+
+class StegoService:
+    """A process pool with a bounded queue in front of it, plus the counters /metrics reports."""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE, timeout=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)  # Running plus queued jobs
+        self.totals = instrumentation.StageTotals()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {"accepted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "in_flight": 0}
+
+    def count(self, **changes):
+        with self.lock:
+            for name, change in changes.items():
+                self.counts[name] += change
+
+    def reserve(self):
+        """Take a job slot, raising ServiceBusy if there is none left."""
+        if not self.slots.acquire(blocking=False):
+            self.count(rejected=1)
+            raise ServiceBusy()
+        self.count(accepted=1, in_flight=1)
+
+    def release(self):
+        self.slots.release()
+        self.count(in_flight=-1)
+
+    def run(self, *job):
+        """Run a job in a slot taken with reserve() and wait for its result.
+
+        The slot is given back when the worker finishes, not when the client stops waiting, so
+        jobs that time out still count against the bound while they run.
+        """
+        future = self.pool.submit(run_service_job, *job)
+        future.add_done_callback(self.finished)
+        return future.result(self.timeout)
+
+    def finished(self, future):
+        if future.cancelled() or future.exception() is not None:
+            self.count(failed=1)
+        else:
+            self.count(succeeded=1)
+            for record in future.result()["records"]:
+                self.totals(record)
+        self.release()
+
+    def health(self):
+        with self.lock:
+            in_flight = self.counts["in_flight"]
+        return {"status": "ok", "workers": self.workers, "queue_size": self.queue_size,
+                "running": min(in_flight, self.workers), "queued": max(in_flight - self.workers, 0)}
+
+    def metrics(self):
+        with self.lock:
+            jobs = dict(self.counts)
+        return {"uptime": time.time() - self.started, "workers": self.workers, "queue_size": self.queue_size,
+                "jobs": jobs, "stages": self.totals.summary()}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def parse_multipart(content_type, body):
+    """Return {field name: (filename, bytes)} for a multipart/form-data body."""
+    message = email.message.Message()
+    message["content-type"] = content_type
+    boundary = message.get_param("boundary")
+    if message.get_content_type() != "multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data upload")
+    header_parser = email.parser.BytesHeaderParser(policy=email.policy.HTTP)
+    fields = {}
+    for part in body.split(b"--" + boundary.encode())[1:]:
+        if part.startswith(b"--"):
+            break  # Closing delimiter
+        head, _, data = part.partition(b"\r\n\r\n")
+        disposition = header_parser.parsebytes(head.lstrip(b"\r\n") + b"\r\n\r\n")["content-disposition"]
+        if disposition is None or "name" not in disposition.params:
+            raise ValueError("Form part without a name")
+        fields[disposition.params["name"]] = (disposition.params.get("filename"), data[:-2] if data.endswith(b"\r\n") else data)
+    return fields
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "StegoService/1.0"
+    service = None  # Set by serve()
+
+    def send_json(self, status, document, headers=()):
+        body = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=()):
+        self.close_connection = True  # The request body may not have been read
+        self.send_json(status, {"error": message}, headers)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self.send_json(200, self.service.health())
+        elif path == "/metrics":
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_error_json(404, f"No such endpoint: {path}")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ("/encode", "/decode"):
+            self.send_error_json(404, f"No such endpoint: {url.path}")
+            return
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.send_error_json(411, "Content-Length required")
+            return
+        if int(length) > MAX_UPLOAD:
+            self.send_error_json(413, f"Upload larger than {MAX_UPLOAD} bytes")
+            return
+        try:
+            self.service.reserve()  # Before reading the body, so a busy service doesn't buffer it
+        except ServiceBusy:
+            self.send_error_json(503, "All workers busy and queue full", [("Retry-After", str(RETRY_AFTER))])
+            return
+        try:
+            job = self.parse_job(url.path[1:], parse_qs(url.query), self.rfile.read(int(length)))
+        except ValueError as e:
+            self.service.count(failed=1)
+            self.service.release()
+            self.send_error_json(400, str(e))
+            return
+        try:
+            result = self.service.run(*job)
+        except ValueError as e:  # No message, payload too large, unsupported cover, ...
+            self.send_error_json(422, str(e))
+            return
+        except TimeoutError:
+            self.send_error_json(504, "Job timed out")
+            return
+        except Exception as e:
+            self.send_error_json(500, f"{type(e).__name__}: {e}")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(result["name"])[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(result["data"])))
+        self.send_header("Content-Disposition", f'attachment; filename="{result["name"]}"')
+        self.end_headers()
+        self.wfile.write(result["data"])
+
+    def parse_job(self, action, query, body):
+        """Turn a request into run_service_job arguments, raising ValueError if it is malformed."""
+        fields = parse_multipart(self.headers.get("Content-Type", ""), body)
+        if "cover" not in fields or (action == "encode" and "payload" not in fields):
+            raise ValueError("Upload a cover field" + (" and a payload field" if action == "encode" else ""))
+        filename, cover = fields["cover"]
+        if not filename:
+            raise ValueError("The cover field needs a filename, so its type is known")
+        value = lambda name, default: query.get(name, [default])[-1]
+        if not value("lsb", "1").isdigit() or not 1 <= int(value("lsb", "1")) <= 8:
+            raise ValueError("lsb must be between 1 and 8")
+        method = value("method", "lsb")
+        if method not in ("lsb", "bpcs"):
+            raise ValueError("method must be lsb or bpcs")
+        options = {name: query[name][-1] for name in OPTIONS if name in query}
+        payload = fields["payload"][1] if action == "encode" else None
+        return action, method, os.path.basename(filename).replace('"', ''), cover, payload, int(value("lsb", "1")), options
+
+    def log_message(self, format, *args):
+        pass  # Stage timings are available from /metrics instead
+
+
+def serve(port=DEFAULT_PORT, workers=None, queue_size=DEFAULT_QUEUE, timeout=None):
+    """Run the service on 127.0.0.1 until interrupted."""
+    service = StegoService(workers, queue_size, timeout)
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    server = ThreadingHTTPServer((HOST, port), handler)
+    server.daemon_threads = True
+    print(f"Listening on http://{HOST}:{server.server_address[1]} with {service.workers} workers "
+          f"and {queue_size} queued jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve LSB/BPCS encode and decode jobs over HTTP on 127.0.0.1.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE,
+                        help=f"Jobs that may wait for a worker before new ones get 503 (default {DEFAULT_QUEUE})")
+    parser.add_argument("--timeout", type=float, default=None, help="Seconds a client waits for its job before 504")
+    args = parser.parse_args(argv)
+    return serve(args.port, args.workers, args.queue, args.timeout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
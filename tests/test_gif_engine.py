@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import plugins
+
+
+def transparent_gif(path):
+    # Half of every frame is transparent, and a few visible pixels share high bits with its index
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(3):
+        pixels = np.zeros((40, 40, 4), dtype=np.uint8)
+        pixels[:, 20:] = np.concatenate([rng.integers(0, 256, (40, 20, 3)), np.full((40, 20, 1), 255)], axis=2)
+        frames.append(Image.fromarray(pixels, 'RGBA'))
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=100, loop=0)
+    return str(path)
+
+
+@pytest.mark.parametrize("num_lsb", [1, 2])
+def test_gif_capacity_is_exact(tmp_path, num_lsb):
+    cover_path = transparent_gif(tmp_path / "cover.gif")
+    plugin = plugins.create_plugin("image")
+    capacity = plugin.capacity(cover_path, num_lsb)
+
+    with Image.open(cover_path) as image:
+        assert capacity < image.width * image.height * image.n_frames * num_lsb // 8
+    payload = bytes(range(256)) * (capacity // 256 + 1)
+    stego_path = plugin.encode(cover_path, payload[:capacity], num_lsb)
+    assert plugin.decode(stego_path, num_lsb) == payload[:capacity]
+    with pytest.raises(ValueError):
+        plugin.encode(cover_path, payload[:capacity + 1], num_lsb)
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+import plugins
+from conftest import ROOT
+
+COLD_START_BUDGET = 10.0  # Seconds for importing the GUI module and decoding one PNG in a fresh interpreter
+
+# Runs in a fresh interpreter. The finder sits in front of every other one, so it sees each attempt
+# to import a heavy module, whether or not the module is installed, and refuses it.
+SCRIPT = """
+import json
+import sys
+import time
+
+HEAVY = {"vlc", "moviepy", "pygame", "pydub", "soundfile", "tkinterdnd2"}
+attempted = []
+
+
+class HeavyImportFinder:
+    def find_spec(self, name, path=None, target=None):
+        if name.partition(".")[0] in HEAVY:
+            attempted.append(name)
+            raise ImportError(f"{name} imported on the image-only path")
+        return None
+
+
+sys.meta_path.insert(0, HeavyImportFinder())
+start = time.perf_counter()
+import lsb_steganography
+import plugins
+imported = time.perf_counter()
+payload = plugins.plugin_for_path("stego.png").decode("stego.png", 1)
+decoded = time.perf_counter()
+print(json.dumps({"attempted": attempted, "payload": payload.decode(),
+                  "import_seconds": imported - start, "decode_seconds": decoded - imported}))
+"""
+
+
+def test_cold_start_image_decode_never_imports_players(tmp_path):
+    Image.fromarray(np.zeros((32, 32, 3), dtype=np.uint8)).save(tmp_path / "cover.png")
+    os.replace(plugins.create_plugin("image").encode(str(tmp_path / "cover.png"), b"hidden", 1), tmp_path / "stego.png")
+
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=tmp_path, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True, check=True)
+    report = json.loads(result.stdout)
+
+    print(f"cold start: import {report['import_seconds']:.3f}s, PNG decode {report['decode_seconds']:.3f}s")
+    assert report["attempted"] == []
+    assert report["payload"] == "hidden"
+    assert report["import_seconds"] + report["decode_seconds"] < COLD_START_BUDGET
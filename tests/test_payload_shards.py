@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import payload_shards
+
+
+def noisy_cover(path, seed):
+    # Noise has complex blocks in every bit plane, so BPCS has room in a small image
+    pixels = np.random.default_rng(seed).integers(0, 256, (128, 128), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return str(path)
+
+
+def test_bpcs_shards_go_to_one_stego_file_per_cover(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    covers = [noisy_cover(tmp_path / f"cover{index}.png", index) for index in range(2)]
+    payload = bytes(range(256)) * 4
+
+    outputs = payload_shards.encode_sharded(covers, payload, 1, "bpcs", workers=1)
+
+    assert outputs == [str(tmp_path / "cover0_bpcs_stego.png"), str(tmp_path / "cover1_bpcs_stego.png")]
+    assert payload_shards.decode_sharded(outputs, 1, "bpcs", workers=1) == payload
+
+
+def test_covers_sharing_a_stego_file_are_rejected(tmp_path):
+    cover = noisy_cover(tmp_path / "cover.png", 0)
+    other = noisy_cover(tmp_path / "cover.bmp", 1)
+    for covers in ([cover, cover], [cover, other]):
+        with pytest.raises(ValueError, match="same stego file"):
+            payload_shards.encode_sharded(covers, b"payload", 1, "bpcs", workers=1)
+    assert not any("_stego" in name for name in os.listdir(tmp_path))
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+import preview_cache
+from conftest import ROOT
+
+
+@pytest.mark.parametrize("name", ["duck.jpg", "pngTest.png", "480-360-sample.bmp", "good-night.gif"])
+def test_thumbnail_of_small_cover_is_loaded(name):
+    thumbnail = preview_cache.load_thumbnail(os.path.join(ROOT, name))
+    assert max(thumbnail.size) <= max(preview_cache.PREVIEW_SIZE)
+    assert len(thumbnail.tobytes()) > 0
+
+
+def test_cache_returns_same_thumbnail():
+    cache = preview_cache.PreviewCache()
+    path = os.path.join(ROOT, "pngTest.png")
+    assert cache.get(path) is cache.get(path)
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import plugins
+import stego_batch
+
+
+def test_batch_over_relative_folder_writes_one_stego_per_cover(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("covers")
+    for index in range(3):
+        pixels = np.full((32, 32, 3), index * 40, dtype=np.uint8)
+        Image.fromarray(pixels).save(os.path.join("covers", f"cover{index}.png"))
+    with open("payload.txt", "wb") as file:
+        file.write(b"hidden")
+
+    assert stego_batch.main(["encode", "--covers", "./covers", "--payload", "payload.txt", "--workers", "1"]) == 0
+
+    outputs = sorted(name for name in os.listdir("covers") if "_stego" in name)
+    assert outputs == ["cover0_stego.png", "cover1_stego.png", "cover2_stego.png"]
+    assert not os.path.exists("_stego.png")
+
+
+def test_run_job_leaves_the_shared_plugin_unconfigured(tmp_path):
+    cover_path = str(tmp_path / "cover.png")
+    Image.fromarray(np.zeros((32, 32, 3), dtype=np.uint8)).save(cover_path)
+    payload_path = tmp_path / "payload.txt"
+    payload_path.write_bytes(b"hidden")
+
+    options = {"key": "k", "codec": "zlib"}
+    result = stego_batch.run_job("encode", "lsb", cover_path, str(payload_path), 1, options=options)
+
+    assert result["status"] == "ok"
+    shared = plugins.get_plugin("image")
+    assert shared.key is None and shared.codec == "none"
+    assert plugins.create_plugin("image", key="k").decode(result["output"], 1) == b"hidden"
@@ -0,0 +1,26 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import stego_service
+
+
+def png_bytes(size):
+    buffer = io.BytesIO()
+    Image.fromarray(np.zeros((size, size, 3), dtype=np.uint8)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_errors_name_the_uploaded_file():
+    with pytest.raises(ValueError) as error:
+        stego_service.run_service_job("encode", "lsb", "holiday.png", png_bytes(16), bytes(10000), 1, {})
+    assert "holiday.png" in str(error.value) and "cover.png" not in str(error.value)
+
+
+def test_round_trip_names_outputs_after_the_upload():
+    encoded = stego_service.run_service_job("encode", "lsb", "holiday.png", png_bytes(32), b"hidden", 1, {})
+    assert encoded["name"] == "holiday_stego.png"
+    decoded = stego_service.run_service_job("decode", "lsb", encoded["name"], encoded["data"], None, 1, {})
+    assert decoded["data"] == b"hidden" and decoded["name"] == "holiday_stego_decoded.txt"
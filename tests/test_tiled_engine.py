@@ -0,0 +1,42 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import plugins
+import tiled_engine
+from conftest import ROOT
+
+
+def copy_cover(tmp_path, name):
+    shutil.copyfile(os.path.join(ROOT, name), tmp_path / name)
+    return str(tmp_path / name)
+
+
+@pytest.mark.parametrize("name", ["duck.jpg", "pngTest.png", "wolf.bmp"])
+def test_tiled_falls_back_for_covers_it_cannot_map(tmp_path, name):
+    cover_path = copy_cover(tmp_path, name)
+    assert not tiled_engine.can_tile(cover_path)
+    plugin = plugins.create_plugin("image", tiled=True)
+
+    stego_path = plugin.encode(cover_path, b"hidden", 1)
+
+    assert stego_path.endswith("_stego.png")
+    assert plugin.decode(stego_path, 1) == b"hidden"
+
+
+def test_tiled_round_trip_and_rejected_job_leaves_no_copy(tmp_path):
+    cover_path = str(tmp_path / "cover.bmp")
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, (300, 40, 3), dtype=np.uint8)).save(cover_path)
+    assert tiled_engine.can_tile(cover_path)
+    plugin = plugins.create_plugin("image", tiled=True, strip_rows=16)
+
+    with pytest.raises(ValueError, match="Insufficient bytes"):
+        plugin.encode(cover_path, bytes(10000), 1)
+    assert os.listdir(tmp_path) == ["cover.bmp"]
+
+    stego_path = plugin.encode(cover_path, b"hidden", 1)
+    assert stego_path == str(tmp_path / "cover_stego.bmp")
+    assert plugin.decode(stego_path, 1) == b"hidden"
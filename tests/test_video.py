@@ -0,0 +1,91 @@
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+import instrumentation
+import lsb_engine
+import plugins
+import video_stream
+from plugins.video import VIDEO_END_BITS, find_terminated_payload
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                                  reason="ffmpeg is not installed")
+PAYLOAD = bytes(range(256)) * 20  # Spans several 64x48 frames at one LSB
+
+
+def make_cover(path, video_offset=0.0):
+    """Write a 3 s, 10 fps test video with a sine audio track, its video starting video_offset s late."""
+    subprocess.run(["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                    "-itsoffset", str(video_offset), "-f", "lavfi", "-i", "testsrc=size=64x48:rate=10:duration=3",
+                    "-map", "1:v", "-map", "0:a", "-c:v", "ffv1", "-c:a", "pcm_s16le", str(path)], check=True)
+    return str(path)
+
+
+def test_seek_time_counts_from_the_video_stream_start():
+    info = video_stream.VideoInfo(64, 48, "10/1", 10.0, 30, 3.0, True, start_time=0.25)
+    assert video_stream.seek_time(info, 5) == pytest.approx(0.25 + 0.45)
+    assert video_stream.seek_time(info._replace(start_time=0.0), 5) == pytest.approx(0.45)
+
+
+def legacy_reference(frames, n_lsb):
+    """The original per-pixel string search for the legacy terminator."""
+    text_bits = ''
+    for frame in frames:
+        for value in frame:
+            text_bits += format(value & ((1 << n_lsb) - 1), f'0{n_lsb}b')
+            if text_bits.endswith(VIDEO_END_BITS):
+                return bytes([int(text_bits[i:i + 8], 2) for i in range(0, len(text_bits) - 64, 8)])
+    return None
+
+
+@pytest.mark.parametrize("n_lsb", [1, 2, 3])
+def test_legacy_terminator_search_matches_the_original_decoder(n_lsb):
+    rng = np.random.default_rng(n_lsb)
+    frames = [rng.integers(0, 256, 9216, dtype=np.uint8) for _ in range(4)]
+    bits = np.concatenate([lsb_engine.bytes_to_bits(b"legacy message" * 150), np.zeros(64, dtype=np.uint8)])
+    flat = np.concatenate(frames)  # The message and its terminator straddle frame boundaries
+    lsb_engine.embed_lsb(flat, bits, n_lsb)
+    frames = np.split(flat, 4)
+
+    with instrumentation.stage("video", "decode", "extract") as stage:
+        found = find_terminated_payload(iter(frames), n_lsb, stage)
+
+    assert found == legacy_reference(frames, n_lsb)
+    assert found.startswith(b"legacy message" * 150)
+
+
+@needs_ffmpeg
+def test_seek_lands_on_the_frame_when_the_video_starts_late(tmp_path):
+    cover_path = make_cover(tmp_path / "cover.mkv", 0.25)
+    info = video_stream.probe_video(cover_path)
+    assert info.start_time == pytest.approx(0.25, abs=0.01)
+    with video_stream.FrameReader(cover_path, info) as reader:
+        frames = list(reader)
+    for frame in (1, 7, 20):
+        with video_stream.FrameReader(cover_path, info, frame, 1) as reader:
+            assert reader.read() == frames[frame]
+
+
+@needs_ffmpeg
+@pytest.mark.parametrize("video_offset", [0.0, 0.25])
+def test_streaming_round_trip(tmp_path, video_offset):
+    cover_path = make_cover(tmp_path / "cover.mkv", video_offset)
+    plugin = plugins.create_plugin("video", start_frame=5, workers=1)
+
+    stego_path = plugin.encode(cover_path, PAYLOAD, 1)
+
+    assert plugin.decode(stego_path, 1) == PAYLOAD
+
+
+@needs_ffmpeg
+def test_frame_dump_round_trip(tmp_path):
+    pytest.importorskip("moviepy.editor")
+    cover_path = make_cover(tmp_path / "cover.mkv")
+    plugin = plugins.create_plugin("video", streaming=False, temp_folder=str(tmp_path / "frames") + "/", workers=1)
+
+    stego_path = plugin.encode(cover_path, PAYLOAD, 1)
+
+    assert plugin.decode(stego_path, 1) == PAYLOAD
+    assert plugins.create_plugin("video", workers=1).decode(stego_path, 1) == PAYLOAD  # Streaming reads it too
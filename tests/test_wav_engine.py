@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+import mmap_engine
+import plugins
+import wav_engine
+from conftest import ROOT
+
+MIXKIT = os.path.join(ROOT, "mixkit-fast-rocket-whoosh-1714.wav")  # WAVE_FORMAT_EXTENSIBLE, 24-bit stereo
+
+
+@pytest.mark.parametrize("key", [None, "secret"])
+def test_extensible_wav_round_trip(tmp_path, key):
+    stego_path = str(tmp_path / "stego.wav")
+    payload = os.urandom(5000)
+
+    wav_engine.encode_wav(MIXKIT, stego_path, payload, 2, block_frames=4096, key=key)
+
+    assert wav_engine.decode_wav(stego_path, 2, block_frames=4096, key=key) == payload
+    cover, stego = mmap_engine.parse_wav(MIXKIT), mmap_engine.parse_wav(stego_path)
+    assert stego == cover and os.path.getsize(stego_path) == os.path.getsize(MIXKIT)
+    with open(MIXKIT, "rb") as file:
+        cover_bytes = file.read()
+    with open(stego_path, "rb") as file:
+        stego_bytes = file.read()
+    assert stego_bytes[:cover.offset] == cover_bytes[:cover.offset]  # fmt chunk kept as is
+
+
+def test_audio_plugin_encodes_extensible_wav(tmp_path):
+    cover_path = str(tmp_path / "whoosh.wav")
+    with open(MIXKIT, "rb") as source, open(cover_path, "wb") as target:
+        target.write(source.read())
+    plugin = plugins.create_plugin("audio")
+
+    assert plugin.capacity(cover_path, 1) > 100
+    stego_path = plugin.encode(cover_path, b"hidden message", 1)
+
+    assert plugin.decode(stego_path, 1) == b"hidden message"
@@ -0,0 +1,158 @@
+"""Tiled, bounded-memory LSB embedding for very large uncompressed image covers.
+
+PIL only reads the header when an image is opened, and for uncompressed BMP, PPM and TIFF files
+its tile descriptors give the file offset, raw mode, stride and row order of the pixel data. The
+engine memory maps that data and walks it in strips of rows, in the same top-down BGR order as
+cv2.imread, so the header and payload land exactly where the whole-image encoder puts them.
+Only one strip is held in memory at a time and no strip past the end of the payload is read.
+"""
+import shutil
+
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import payload_codec
+import stego_header
+
+STRIP_ROWS = 256  # Rows of pixels held in memory at a time
+
+# Raw modes PIL uses for uncompressed pixel data: channel count and whether the order is RGB
+RAW_MODES = {'RGB': (3, True), 'RGBA': (4, True), 'RGBX': (4, True),
+             'BGR': (3, False), 'BGRA': (4, False), 'BGRX': (4, False)}
+
+
+class Raster:
+    """A memory-mapped view of the pixel data of an uncompressed image, read in row strips."""
+
+    def __init__(self, path, writable=False):
+        from PIL import Image  # Only the header is parsed here
+        with Image.open(path) as image:
+            self.width, self.height = image.size
+            tiles = list(image.tile)
+        self.memmap = np.memmap(path, dtype=np.uint8, mode='r+' if writable else 'r')
+        self.tiles = [self.tile_view(tile) for tile in tiles]  # (first row, last row, BGR view)
+        covered = sorted((first, last) for first, last, _ in self.tiles)
+        if covered[0][0] != 0 or covered[-1][1] != self.height or \
+                any(a[1] != b[0] for a, b in zip(covered, covered[1:])):
+            raise ValueError("Tiled mode needs full-width strips covering the whole image.")
+
+    def tile_view(self, tile):
+        codec, (x0, y0, x1, y1), offset, args = tile
+        if codec != 'raw':
+            raise ValueError("Tiled mode needs an uncompressed 24 or 32-bit BMP, PPM or TIFF cover.")
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if rawmode not in RAW_MODES or x0 != 0 or x1 != self.width:
+            raise ValueError("Tiled mode needs an uncompressed 24 or 32-bit BMP, PPM or TIFF cover.")
+        channels, rgb = RAW_MODES[rawmode]
+        rows = y1 - y0
+        stride = stride or self.width * channels
+        data = self.memmap[offset:offset + stride * rows].reshape(rows, stride)
+        pixels = data[:, :self.width * channels].reshape(rows, self.width, channels)
+        pixels = pixels[:, :, 2::-1] if rgb else pixels[:, :, :3]  # BGR, like cv2.imread
+        return y0, y1, pixels[::-1] if orientation < 0 else pixels
+
+    def read_rows(self, start, stop):
+        """Return a contiguous BGR copy of rows start to stop."""
+        return np.concatenate([view[max(start, first) - first:min(stop, last) - first]
+                               for first, last, view in self.tiles if first < stop and start < last])
+
+    def write_rows(self, start, block):
+        """Write a block of BGR rows back to the mapped file."""
+        stop = start + len(block)
+        for first, last, view in self.tiles:
+            if first < stop and start < last:
+                low, high = max(start, first), min(stop, last)
+                view[low - first:high - first] = block[low - start:high - start]
+
+    def strips(self, strip_rows=STRIP_ROWS):
+        """Yield (first row, BGR strip) pairs from the top of the image down."""
+        for start in range(0, self.height, strip_rows):
+            yield start, self.read_rows(start, min(start + strip_rows, self.height))
+
+    def close(self):
+        self.memmap.flush()
+        del self.memmap
+
+
+def can_tile(path):
+    """Return whether path is an uncompressed image whose pixel data can be mapped in strips."""
+    try:
+        Raster(path).close()  # Parses the header and maps the file without reading any pixels
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def encode_tiled(cover_path, stego_path, payload, num_lsb, strip_rows=STRIP_ROWS, in_place=False,
+                 codec=payload_codec.CODEC_NONE):
+    """Hide payload bytes behind a stego header, one strip of rows at a time.
+
+    Once the cover is known to be tileable and large enough, it is copied to stego_path (or
+    modified itself with in_place=True) and only the strips that carry the header and payload are
+    read and rewritten.
+    """
+    with instrumentation.stage("image", "encode", "bit_prep") as stage:
+        payload = payload_codec.pack_payload(payload, codec)
+        plan = lsb_engine.payload_plan(payload, num_lsb, stego_header.MODALITY_IMAGE)
+        stage.add(bytes=len(payload))
+    read_stage = instrumentation.stage("image", "encode", "cover_read", path=cover_path)
+    embed_stage = instrumentation.stage("image", "encode", "embed")
+    write_stage = instrumentation.stage("image", "encode", "write", path=stego_path)
+    with read_stage.lap():
+        raster = Raster(cover_path, writable=in_place)
+    row_elements = raster.width * 3
+    if len(payload) > lsb_engine.payload_capacity(row_elements * raster.height, num_lsb):
+        raster.close()
+        raise ValueError("Insufficient bytes, need bigger image, smaller payload or more LSB.")
+    if not in_place:
+        raster.close()  # Checked on the cover, so a rejected job leaves no copy behind
+        with read_stage.lap():
+            shutil.copyfile(cover_path, stego_path)
+            raster = Raster(stego_path, writable=True)
+    end = lsb_engine.plan_end(plan)
+    for start in range(0, raster.height, strip_rows):
+        if start * row_elements >= end:
+            break  # The payload is fully embedded; leave the remaining strips untouched
+        with read_stage.lap(count=1):
+            strip = raster.read_rows(start, min(start + strip_rows, raster.height))
+        with embed_stage.lap(count=1):
+            lsb_engine.apply_plan(strip.reshape(-1), start * row_elements, plan)
+        with write_stage.lap(bytes=strip.nbytes, count=1):
+            raster.write_rows(start, strip)
+    with write_stage.lap():
+        raster.close()
+    read_stage.done()
+    embed_stage.done(bytes=len(payload))
+    write_stage.done()
+    return cover_path if in_place else stego_path
+
+
+def decode_tiled(stego_path, num_lsb, strip_rows=STRIP_ROWS):
+    """Return the payload bytes hidden in an image, reading only the strips that carry them."""
+    raster = Raster(stego_path)
+    row_elements = raster.width * 3
+    header_rows = -(-stego_header.HEADER_BITS // row_elements)
+    header = lsb_engine.read_header(raster.read_rows(0, header_rows).reshape(-1))
+    if header is None:
+        # Legacy sentinel format: scan strip by strip until the marker turns up
+        chunks = (strip.reshape(-1) for _, strip in raster.strips(strip_rows))
+        return lsb_engine.scan_legacy_payload(chunks, num_lsb, lsb_engine.IMAGE_STOP_MARKER)
+
+    first = stego_header.HEADER_BITS
+    end = first + -(-header.length * 8 // header.num_lsb)
+    if end > row_elements * raster.height:
+        raise ValueError("Header payload length exceeds the cover capacity.")
+    bits = []
+    with instrumentation.stage("image", "decode", "extract", path=stego_path) as stage:
+        for start, strip in raster.strips(strip_rows):
+            flat = strip.reshape(-1)
+            low, high = max(first, start * row_elements), min(end, start * row_elements + flat.size)
+            if low < high:
+                bits.append(lsb_engine.extract_lsb(flat[low - start * row_elements:high - start * row_elements], header.num_lsb))
+            stage.add(bytes=strip.nbytes, count=1)
+            if high >= end:
+                break  # Stop reading strips once the payload is complete
+        stored = lsb_engine.bits_to_bytes(np.concatenate(bits)[:header.length * 8])
+    with instrumentation.stage("image", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
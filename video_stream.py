@@ -0,0 +1,200 @@
+"""Raw-frame video streaming over ffmpeg pipes.
+
+Frames are decoded by one ffmpeg process into bgr24 bytes on its stdout and encoded by another from
+its stdin, so nothing is written to disk between reading the cover and writing the stego video.
+bgr24 matches the channel order cv2.imread gives the frame-dump path.
+
+Stego frames must survive encoding bit for bit, so only lossless video codecs are offered. PNG
+is the original choice; FFV1 and lossless x264/x265 (in RGB, so no chroma subsampling touches
+the LSBs) trade encode speed against file size through their presets.
+"""
+import json
+import subprocess
+from collections import namedtuple
+
+# start_time is how far the video stream starts after the container does, in seconds
+VideoInfo = namedtuple("VideoInfo", ["width", "height", "rate", "fps", "frame_count", "duration", "has_audio",
+                                     "start_time"], defaults=(0.0,))
+
+PIXEL_FORMAT = "bgr24"
+CHANNELS = 3
+
+VIDEO_CODECS = {
+    "png": ["-c:v", "png"],
+    "ffv1": ["-c:v", "ffv1", "-level", "3", "-pix_fmt", "bgr0", "-g", "1"],  # Intra-only; level 3 slices frames across threads
+    "x264": ["-c:v", "libx264rgb", "-qp", "0"],
+    "x265": ["-c:v", "libx265", "-pix_fmt", "gbrp", "-x265-params", "lossless=1:log-level=error"],
+}
+PRESET_CODECS = ("x264", "x265")  # Codecs that take a speed preset
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+DEFAULT_VIDEO_CODEC = "png"
+DEFAULT_PRESET = "ultrafast"
+
+
+def parse_rate(rate):
+    """Turn an ffprobe frame rate such as '30000/1001' into frames per second."""
+    numerator, _, denominator = rate.partition('/')
+    denominator = float(denominator or 1)
+    return float(numerator) / denominator if denominator else 0.0
+
+
+def probe_video(path):
+    """Read the size, frame rate, frame count, audio presence and start offset of a video with ffprobe."""
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", path],
+        capture_output=True, check=True).stdout
+    probe = json.loads(output)
+    streams = probe.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise ValueError(f"No video stream found in {path}")
+    rate = video.get("avg_frame_rate") or video.get("r_frame_rate") or "0/1"
+    if parse_rate(rate) == 0:
+        rate = video.get("r_frame_rate", "0/1")
+    fps = parse_rate(rate)
+    duration = float(video.get("duration") or probe.get("format", {}).get("duration") or 0)
+    frame_count = int(video["nb_frames"]) if video.get("nb_frames", "").isdigit() else int(round(duration * fps))
+    has_audio = any(s.get("codec_type") == "audio" for s in streams)
+    # Audio priming or shifted timestamps can start the video after the container; input seeks count from the latter
+    container_start = float(probe.get("format", {}).get("start_time") or 0)
+    start_time = max(float(video.get("start_time") or container_start) - container_start, 0.0)
+    return VideoInfo(int(video["width"]), int(video["height"]), rate, fps, frame_count, duration, has_audio, start_time)
+
+
+def seek_time(info, frame):
+    """Return an input seek position, in seconds, that lands exactly on frame.
+
+    ffmpeg starts output at the first frame at or after the position, so seeking half a frame
+    early is safe from rounding in either direction. Input seeks are relative to the start of the
+    container, so the video stream's own start offset is added.
+    """
+    return info.start_time + max(frame - 0.5, 0) / info.fps
+
+
+def codec_args(video_codec=DEFAULT_VIDEO_CODEC, preset=DEFAULT_PRESET):
+    """Return the ffmpeg output options for one of the lossless VIDEO_CODECS."""
+    if video_codec not in VIDEO_CODECS:
+        raise ValueError(f"Unsupported video codec {video_codec!r}, choose from {', '.join(VIDEO_CODECS)}")
+    if preset not in PRESETS:
+        raise ValueError(f"Unsupported preset {preset!r}, choose from {', '.join(PRESETS)}")
+    args = list(VIDEO_CODECS[video_codec])
+    if video_codec in PRESET_CODECS:
+        args += ["-preset", preset]
+    return args
+
+
+def audio_args(info, audio_source):
+    """Return the ffmpeg options that copy audio_source's audio, unchanged, next to input 0's video."""
+    if not audio_source or not info.has_audio:
+        return ["-map", "0:v:0"]
+    return ["-i", audio_source, "-map", "0:v:0", "-map", "1:a?", "-c:a", "copy"]
+
+
+def mux_frames(frame_pattern, info, output_path, audio_source=None, video_codec=("-c:v", "png")):
+    """Encode numbered frame images into output_path in one ffmpeg run, raising RuntimeError if it fails.
+
+    Audio is stream-copied from audio_source, so nothing besides the frames is written along the way.
+    """
+    command = ["ffmpeg", "-v", "error", "-y", "-framerate", info.rate, "-i", frame_pattern]
+    command += audio_args(info, audio_source) + list(video_codec) + [output_path]
+    process = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed writing {output_path}: {process.stderr.decode(errors='replace').strip()}")
+
+
+def frame_size(info):
+    """Return the number of bytes in one raw frame."""
+    return info.width * info.height * CHANNELS
+
+
+class FrameReader:
+    """Iterate over the raw frames of a video decoded by an ffmpeg subprocess.
+
+    With start_frame, ffmpeg seeks in the input (using the container index) before decoding, and
+    with frame_count it stops after that many frames, so the rest of the video is never decoded.
+    """
+
+    def __init__(self, path, info, start_frame=0, frame_count=None):
+        self.info = info
+        self.frame_size = frame_size(info)
+        command = ["ffmpeg", "-v", "error"]
+        if start_frame:
+            command += ["-ss", f"{seek_time(info, start_frame):.6f}"]
+        command += ["-i", path, "-map", "0:v:0"]
+        if frame_count is not None:
+            command += ["-frames:v", str(frame_count)]
+        command += ["-f", "rawvideo", "-pix_fmt", PIXEL_FORMAT, "-"]
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        bufsize=self.frame_size)
+
+    def read(self):
+        """Return the next frame as a writable bytearray, or None at the end of the video."""
+        frame = bytearray(self.frame_size)
+        view = memoryview(frame)
+        filled = 0
+        while filled < self.frame_size:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return None  # End of stream (a trailing partial frame is dropped)
+            filled += count
+        return frame
+
+    def __iter__(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        """Stop the decoder, even if frames are left unread."""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameWriter:
+    """Encode raw frames written to an ffmpeg subprocess into a video file.
+
+    When audio_source is given its audio streams are copied into the output unchanged.
+    video_codec is a list of ffmpeg output options, usually from codec_args().
+    """
+
+    def __init__(self, output_path, info, audio_source=None, video_codec=("-c:v", "png")):
+        command = ["ffmpeg", "-v", "error", "-y",
+                   "-f", "rawvideo", "-pix_fmt", PIXEL_FORMAT, "-s", f"{info.width}x{info.height}",
+                   "-r", info.rate, "-i", "-"]
+        command += audio_args(info, audio_source) + list(video_codec) + [output_path]
+        self.output_path = output_path
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        self.process.stdin.write(frame)
+
+    def close(self):
+        """Finish the output file, raising RuntimeError if ffmpeg failed."""
+        self.process.stdin.close()
+        error = self.process.stderr.read()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed writing {self.output_path}: {error.decode(errors='replace').strip()}")
+
+    def abort(self):
+        """Stop ffmpeg without finishing the output file."""
+        self.process.kill()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,230 @@
+"""Vectorized LSB embedding for PCM WAV files.
+
+WAV samples are little-endian, so the num_lsb (at most 8) low bits of every sample live in its
+first byte whatever the sample width. The engine views the PCM bytes as (samples, sampwidth) and
+works on column 0, leaving the high bytes of 16/24/32-bit samples untouched.
+
+The RIFF chunks are parsed by hand with mmap_engine.parse_wav, as the wave module refuses
+WAVE_FORMAT_EXTENSIBLE files before Python 3.12. The data chunk is streamed in fixed-size blocks
+of frames, so memory stays bounded by the block size however long the recording is, and every
+other chunk is copied to the output byte for byte. Reading stops as soon as the payload has been
+extracted, and blocks after the payload are copied to the output as raw bytes. With a key the
+payload is scattered over the whole recording, so keyed files are read and written in one piece.
+"""
+import itertools
+import os
+import shutil
+
+import numpy as np  # Import numpy for array manipulation
+
+import instrumentation
+import lsb_engine
+import mmap_engine
+import payload_codec
+import stego_header
+
+LEGACY_END_DELIMITER = np.ones(16, dtype=np.uint8)  # The byte-wise format ended with sixteen 1 bits
+BLOCK_FRAMES = 1 << 16  # Frames read per block when streaming a WAV file
+
+
+def sample_lsb_view(frames, sampwidth):
+    """Return a uint8 view of the low byte of every sample in a PCM buffer."""
+    data = np.frombuffer(frames, dtype=np.uint8)
+    return data[:len(data) // sampwidth * sampwidth].reshape(-1, sampwidth)[:, 0]
+
+
+def wav_info(path):
+    """Return the data chunk layout of a PCM WAV file, raising ValueError if it has none."""
+    info = mmap_engine.parse_wav(path)
+    if info is None:
+        raise ValueError(f"Not a PCM WAV file: {os.path.basename(path)}")
+    return info
+
+
+def iter_data_blocks(file, info, block_frames=BLOCK_FRAMES):
+    """Yield the data chunk of an open WAV file as raw blocks of block_frames frames."""
+    file.seek(info.offset)
+    remaining = info.size
+    while remaining:
+        frames = file.read(min(block_frames * info.sampwidth * info.nchannels, remaining))
+        if not frames:
+            return
+        remaining -= len(frames)
+        yield frames
+
+
+def read_wav(path):
+    """Read a whole WAV file, returning its data chunk layout and a writable copy of its PCM frames."""
+    info = wav_info(path)
+    with open(path, 'rb') as file:
+        file.seek(info.offset)
+        frames = bytearray(file.read(info.size))  # The only copy of the samples
+    return info, frames
+
+
+def write_wav(path, cover_path, info, frames):
+    """Write a copy of cover_path with frames in place of its PCM data, keeping every other chunk."""
+    with open(cover_path, 'rb') as cover, open(path, 'wb') as stego:
+        stego.write(cover.read(info.offset))
+        stego.write(frames)
+        cover.seek(info.offset + len(frames))
+        shutil.copyfileobj(cover, stego)  # Chunks after the data, such as LIST
+
+
+def encode_wav(cover_path, stego_path, payload, num_lsb, block_frames=BLOCK_FRAMES, codec=payload_codec.CODEC_NONE,
+               key=None):
+    """Hide payload bytes behind a stego header in the num_lsb low bits of every sample."""
+    if key is not None:
+        return encode_wav_scattered(cover_path, stego_path, payload, num_lsb, codec, key)
+    with instrumentation.stage("audio", "encode", "bit_prep") as stage:
+        payload = payload_codec.pack_payload(payload, codec)
+        plan = lsb_engine.payload_plan(payload, num_lsb, stego_header.MODALITY_AUDIO)
+        stage.add(bytes=len(payload))
+    plan_end = lsb_engine.plan_end(plan)  # Samples after this are copied as is
+    embed_stage = instrumentation.stage("audio", "encode", "embed")
+    write_stage = instrumentation.stage("audio", "encode", "write", path=stego_path)
+    info = wav_info(cover_path)
+    if len(payload) > lsb_engine.payload_capacity(info.size // info.sampwidth, num_lsb):
+        raise ValueError("Insufficient bytes, need longer audio, smaller payload or more LSB.")
+    read_stage = instrumentation.stage("audio", "encode", "cover_read", path=cover_path,
+                                       total=-(-info.size // (block_frames * info.sampwidth * info.nchannels)))
+    # The stego file is only created once the payload is known to fit
+    with open(cover_path, 'rb') as cover, open(stego_path, 'wb') as stego:
+        with write_stage.lap(bytes=info.offset):
+            stego.write(cover.read(info.offset))  # RIFF header and the chunks before the data as they are
+        blocks = iter_data_blocks(cover, info, block_frames)
+        first_sample = 0
+        while True:
+            with read_stage.lap(count=1):
+                frames = next(blocks, None)
+            if frames is None:
+                break
+            if first_sample < plan_end:
+                with embed_stage.lap(count=1):
+                    frames = bytearray(frames)
+                    samples = sample_lsb_view(frames, info.sampwidth)
+                    lsb_engine.apply_plan(samples, first_sample, plan)
+                    first_sample += len(samples)
+            with write_stage.lap(bytes=len(frames), count=1):
+                stego.write(frames)
+        with write_stage.lap():
+            shutil.copyfileobj(cover, stego)  # Chunks after the data, such as LIST
+    read_stage.done(bytes=info.size)
+    embed_stage.done(bytes=len(payload))
+    write_stage.done()
+    return stego_path
+
+
+def encode_wav_scattered(cover_path, stego_path, payload, num_lsb, codec, key):
+    """Hide payload bytes at the key's scattered sample positions of a whole WAV file."""
+    with instrumentation.stage("audio", "encode", "cover_read", path=cover_path) as stage:
+        info, frames = read_wav(cover_path)
+        stage.add(bytes=len(frames))
+    with instrumentation.stage("audio", "encode", "bit_prep") as stage:
+        payload = payload_codec.pack_payload(payload, codec)
+        stage.add(bytes=len(payload))
+    samples = sample_lsb_view(frames, info.sampwidth)
+    if len(payload) > lsb_engine.payload_capacity(samples.size, num_lsb):
+        raise ValueError("Insufficient bytes, need longer audio, smaller payload or more LSB.")
+    with instrumentation.stage("audio", "encode", "embed") as stage:
+        stage.add(bytes=len(payload), count=lsb_engine.embed_payload(samples, payload, num_lsb,
+                                                                     stego_header.MODALITY_AUDIO, key))
+    with instrumentation.stage("audio", "encode", "write", path=stego_path) as stage:
+        write_wav(stego_path, cover_path, info, frames)
+        stage.add(bytes=len(frames))
+    return stego_path
+
+
+def decode_wav_scattered(stego_path, num_lsb, key):
+    """Return the payload bytes hidden at the key's scattered sample positions of a WAV file."""
+    with instrumentation.stage("audio", "decode", "cover_read", path=stego_path) as stage:
+        info, frames = read_wav(stego_path)
+        stage.add(bytes=len(frames))
+    samples = sample_lsb_view(frames, info.sampwidth)
+    header = lsb_engine.read_header(samples)
+    if header is None:
+        return decode_legacy(frames, num_lsb)
+    with instrumentation.stage("audio", "decode", "extract", path=stego_path) as stage:
+        stored = lsb_engine.extract_payload(samples, header, key)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("audio", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
+
+
+def iter_sample_blocks(stego_path, block_frames=BLOCK_FRAMES):
+    """Yield (data chunk layout, raw frames, low-byte sample view) for each block of a WAV file."""
+    info = wav_info(stego_path)
+    with open(stego_path, 'rb') as file:
+        for frames in iter_data_blocks(file, info, block_frames):
+            yield info, frames, sample_lsb_view(frames, info.sampwidth)
+
+
+def decode_wav(stego_path, num_lsb, block_frames=BLOCK_FRAMES, key=None):
+    """Return the payload bytes hidden in a WAV file.
+
+    Files with a stego header are read only up to the recorded length; anything else is decoded in
+    the legacy byte-wise format, one bit per byte at position num_lsb - 1 up to sixteen 1 bits.
+    """
+    if key is not None:
+        return decode_wav_scattered(stego_path, num_lsb, key)
+    blocks = iter_sample_blocks(stego_path, block_frames)
+    pending = []  # Blocks read before the header could be parsed
+    header = None
+    for info, frames, samples in blocks:
+        pending.append((frames, samples))
+        if sum(len(s) for _, s in pending) >= stego_header.HEADER_BITS:
+            header = lsb_engine.read_header(np.concatenate([s for _, s in pending]))
+            break
+    if header is None:
+        remaining = (frames for _, frames, _ in blocks)
+        return decode_legacy_blocks(itertools.chain((frames for frames, _ in pending), remaining), num_lsb)
+
+    needed = stego_header.HEADER_BITS + -(-header.length * 8 // header.num_lsb)  # Samples holding the payload
+    chunks = []
+    read = 0
+    with instrumentation.stage("audio", "decode", "cover_read", path=stego_path) as stage:
+        for samples in itertools.chain((s for _, s in pending), (s for _, _, s in blocks)):
+            chunks.append(samples[:max(needed - read, 0)].copy())
+            read += len(samples)
+            if read >= needed:
+                break  # Stop reading the file once the payload is complete
+        stage.add(count=read)
+    samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8)
+    with instrumentation.stage("audio", "decode", "extract", path=stego_path) as stage:
+        stored = lsb_engine.extract_payload(samples, header)
+        stage.add(bytes=len(stored))
+    with instrumentation.stage("audio", "decode", "unpack"):
+        return payload_codec.unpack_payload(stored, header)
+
+
+def decode_legacy_blocks(blocks, num_lsb):
+    """Decode the original byte-wise audio format from an iterable of raw PCM blocks."""
+    run = len(LEGACY_END_DELIMITER)
+    chunks = []
+    total_bits = 0
+    carry = np.zeros(0, dtype=np.uint8)
+    for frames in blocks:
+        bits = (np.frombuffer(frames, dtype=np.uint8) >> (num_lsb - 1)) & 1
+        window = np.concatenate([carry, bits])
+        end = lsb_engine.find_zero_run(1 - window, run, total_bits - len(carry))  # First run of sixteen 1 bits
+        chunks.append(bits)
+        total_bits += len(bits)
+        if end is not None:
+            return bits_to_legacy_payload(np.concatenate(chunks)[:end - run])
+        carry = window[-(run - 1):]
+    return bits_to_legacy_payload(np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.uint8))
+
+
+def decode_legacy(frames, num_lsb):
+    """Decode the original byte-wise audio format from raw PCM bytes."""
+    return decode_legacy_blocks([frames], num_lsb)
+
+
+def bits_to_legacy_payload(bits):
+    """Turn legacy payload bits into bytes, keeping a trailing partial byte as the old decoder did."""
+    payload = lsb_engine.bits_to_bytes(bits)
+    tail = bits[len(bits) // 8 * 8:]
+    if len(tail):
+        # A trailing partial byte was read as a short binary number
+        payload += bytes([int(''.join(map(str, tail)), 2)])
+    return payload